@@ -1,30 +1,199 @@
-from flask import Flask, request, jsonify, render_template
-from rag.query_data_pc import query_rag  # Your RAG logic
+import itertools
+import json
+import os
+
+import time
+
+from flask import Flask, Response, request, jsonify, stream_with_context
+# only light modules here: the RAG logic (rag.query_data_pc, rag.batch_query) and with it langchain,
+# pinecone and ollama are imported by the routes that need them, so the static pages start fast
+from page_cache import PageCache
+from rag.admission import Overloaded
+from rag.metrics import METRICS
+from rag.runtime import current_runtime
+from rag.warmup import start_warmup, warmup_state
 
 app = Flask(__name__)
 
+# the pages below have no per-request data: rendered once, precompressed, served with ETags / 304s.
+# also fingerprints url_for('static', ...) urls so the css and images can be cached immutably
+pages = PageCache(app)
+
+BATCH_MAX_QUESTIONS = int(os.getenv('RAG_BATCH_MAX_QUESTIONS', '1000'))
+WARMUP_ENABLED = os.getenv('RAG_WARMUP', '1') == '1'
+WARMUP_RETRY_SECONDS = 30
+
+# build the embeddings / pinecone / LLM objects and load both Ollama models in the background at startup;
+# every request reuses them. if a backing service is down the static pages still work, /ready reports it
+# and /ask retries the build lazily.
+if WARMUP_ENABLED:
+    start_warmup()
+
 @app.route('/')
 def home():
-    return render_template('home.html')  # or home.html if you have one
+    return pages.render('home.html')  # or home.html if you have one
 
 @app.route('/about')
 def about():
-    return render_template('about.html')
+    return pages.render('about.html')
 
 @app.route('/insights')
 def insights():
-    return render_template('insights.html')
+    return pages.render('insights.html')
 
 @app.route('/model')
 def model():
-    return render_template('model.html')  # This loads model.html from /templates
+    return pages.render('model.html')  # This loads model.html from /templates
 
 @app.route('/ask', methods=['POST'])
 def ask():
+    from rag.query_data_pc import query_rag
+
     user_query = request.form.get('query')
-    answer = query_rag(user_query)
+    if not user_query or not user_query.strip():
+        return jsonify({'error': 'Please enter a question.'}), 400
+    try:
+        answer = query_rag(user_query)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except TimeoutError as e:
+        # Ollama stopped responding (OLLAMA_GENERATE_TIMEOUT), the worker is free again
+        print(f"❌ {e}")
+        return jsonify({'error': 'The model took too long to answer, please try again.'}), 504
     return jsonify({'answer': answer})
 
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    # same as /ask but sends the answer as Server-Sent Events while the LLM is generating
+    from rag.query_data_pc import stream_rag
+
+    user_query = request.form.get('query')
+    if not user_query or not user_query.strip():
+        return jsonify({'error': 'Please enter a question.'}), 400
+
+    # run up to the first event here: a saturated queue becomes a plain 503 (and any other early failure a
+    # JSON error) before any streaming starts
+    events = stream_rag(user_query)
+    try:
+        first = next(events)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except TimeoutError as e:
+        print(f"❌ {e}")
+        return jsonify({'error': 'The model took too long to answer, please try again.'}), 504
+    except Exception as e:
+        print(f"❌ Streaming error: {e}")
+        return jsonify({'error': 'Something went wrong. Please try again.'}), 500
+
+    def generate():
+        try:
+            for event, data in itertools.chain([first], events):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            print(f"❌ Streaming error: {e}")
+            yield f"event: error\ndata: {json.dumps('Something went wrong. Please try again.')}\n\n"
+        finally:
+            events.close()
+
+    # when the client goes away the server closes generate(), which closes stream_rag
+    # and with it the request to Ollama
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/ask/batch', methods=['POST'])
+def ask_batch():
+    # evaluation runs: a JSON array (or {"questions": [...]}) or a JSONL body of questions,
+    # answered together and streamed back as JSONL, one line per question as soon as it is done
+    from rag.batch_query import answer_batch, parse_questions, read_questions
+
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            questions = read_questions(request.get_data(as_text=True).splitlines())
+        else:
+            payload = request.get_json(force=True)
+            questions = parse_questions(payload.get('questions', []) if isinstance(payload, dict) else payload)
+    except Exception as e:
+        return jsonify({'error': f'Invalid batch: {e}'}), 400
+    if not questions:
+        return jsonify({'error': 'No questions given.'}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({'error': f'At most {BATCH_MAX_QUESTIONS} questions per batch.'}), 413
+
+    def generate():
+        results = answer_batch(questions)
+        try:
+            for result in results:
+                yield json.dumps(result) + '\n'
+        finally:
+            # client went away: cancel the questions that have not started
+            results.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+def overloaded_response(error):
+    # fast rejection with a retry hint instead of queueing behind a thrashing Ollama
+    response = jsonify({'error': 'The model is busy right now, please try again shortly.',
+                        'retry_after': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.route('/ask/stats')
+def ask_stats():
+    # queue depth / wait times of the LLM gate and how many requests were coalesced.
+    # like /metrics, never builds the runtime: before the first question / warm-up there is nothing to report
+    runtime = current_runtime()
+    if runtime is None:
+        return jsonify({'llm_gate': None, 'single_flight': None, 'answer_cache': None})
+    return jsonify({
+        'llm_gate': runtime.llm_gate.stats(),
+        'single_flight': runtime.single_flight.stats(),
+        'answer_cache': runtime.answer_cache.stats() if runtime.answer_cache else None,
+    })
+
+@app.route('/ready')
+def ready():
+    # readiness probe: 200 once the RAG path is hot (runtime built, both models loaded), 503 until then
+    state = warmup_state()
+    if not WARMUP_ENABLED:
+        is_ready = current_runtime() is not None
+    else:
+        is_ready = state['status'] == 'ready'
+        # ollama / pinecone may have come up since the last attempt
+        if state['status'] == 'failed' and time.time() - state['started'] > WARMUP_RETRY_SECONDS:
+            start_warmup()
+    return jsonify({'ready': is_ready, 'warmup': state}), 200 if is_ready else 503
+
+def runtime_gauges():
+    # current queue / cache state, read at scrape time; a scrape never triggers the (slow) runtime build
+    yield 'rag_ready', {}, int(warmup_state()['status'] == 'ready' or current_runtime() is not None)
+    runtime = current_runtime()
+    if runtime is None:
+        return
+    gate = runtime.llm_gate.stats()
+    yield 'rag_llm_running', {}, gate['running']
+    yield 'rag_llm_queue_depth', {}, gate['queue_depth']
+    for outcome in ('admitted', 'rejected', 'timed_out'):
+        yield 'rag_llm_admissions', {'outcome': outcome}, gate[outcome]
+    flight = runtime.single_flight.stats()
+    yield 'rag_single_flight_in_flight', {}, flight['in_flight']
+    yield 'rag_single_flight_coalesced', {}, flight['coalesced']
+    if runtime.answer_cache:
+        for key, value in runtime.answer_cache.stats().items():
+            if isinstance(value, (int, float)):
+                yield f'rag_answer_cache_{key}', {}, value
+
+METRICS.register_gauges(runtime_gauges)
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format: per-stage latency p50/p95/p99, token counts, tokens/sec, request outcomes
+    return Response(METRICS.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True)
 
@@ -0,0 +1,338 @@
+# end-to-end benchmarks of the Flask app and the ingestion path, with no live services:
+# Ollama and Pinecone are replaced by the in-process fakes in benchmarks/fake_services.py
+#
+#   python -m benchmarks.bench_e2e                                   # every scenario
+#   python -m benchmarks.bench_e2e --scenario single --scenario load --concurrency 16
+#   python -m benchmarks.bench_e2e --tokens-per-second 15 --output bench-$(git rev-parse --short HEAD).json
+#
+# scenarios
+#   ingest  synthetic text pdfs -> load_documents -> split_documents -> add_to_pinecone
+#   single  sequential /ask (latency) and /ask/stream (time to first token) requests
+#   load    concurrent /ask requests from --concurrency clients (throughput, latency, 503s)
+#
+# the results (plus the app's per-stage metrics for each scenario) are printed as JSON, so runs can be diffed
+# across commits. the answer and embedding caches are off unless --answer-cache / --embedding-cache is given.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.bench_local_index import DEFAULT_QUESTIONS
+from benchmarks.fake_services import FakeOllama, FakePinecone
+
+SCENARIOS = ("ingest", "single", "load")
+
+VOCABULARY = (
+    "mentor mentee youth program match training support relationship career skills newcomer racialized "
+    "survey report outcomes access barriers community school volunteer goals trust confidence education "
+    "employment network family culture retention recruitment screening evaluation practice canada"
+).split()
+
+
+def _summary(timings):
+    if not timings:
+        return {}
+    timings = sorted(timings)
+    return {
+        "n": len(timings),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+        "p99_ms": round(timings[int(0.99 * (len(timings) - 1))], 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def synthetic_text(rng, words):
+    return " ".join(rng.choice(VOCABULARY, size=words)).capitalize() + "."
+
+
+def make_text_pdf(path, pages, rng, lines_per_page=45, words_per_line=12):
+    """
+    writes a pdf with a real text layer (what rag/processed_pdfs holds after OCR), no dependencies needed
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for _ in range(pages):
+        lines = [synthetic_text(rng, words_per_line) for _ in range(lines_per_page)]
+        text = " T* ".join(f"({line})Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 50 750 Td {text} ET".encode()
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + (body if isinstance(body, bytes) else body.encode()) + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def seed_index(pinecone, ollama, chunks, rng):
+    """
+    fills the fake index directly with synthetic chunks shaped like populate_database_pc.py's records
+    """
+    records = []
+    for number in range(chunks):
+        text = " ".join(synthetic_text(rng, 15) for _ in range(10))
+        chunk_id = f"rag/processed_pdfs/Synthetic_{number // 50}_ocr.pdf:{number % 50}:0"
+        metadata = {"id": chunk_id, "source": chunk_id.split(":")[0], "page": float(number % 50), "text": text}
+        records.append({"id": chunk_id, "values": ollama.embed_text(text), "metadata": metadata})
+    pinecone.upsert(records)
+
+
+def scenario_ingest(args, pinecone, rng):
+    import rag.populate_database_pc as populate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_text_pdf(os.path.join(tmp, f"Synthetic_{n}_ocr.pdf"), args.pages, rng) for n in range(args.pdfs)]
+
+        start = time.perf_counter()
+        documents = populate.load_documents(paths)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunks = populate.calculate_chunk_ids(populate.split_documents(documents))
+        split_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = populate.add_to_pinecone(
+            chunks,
+            batch_size=args.batch_size,
+            embed_workers=args.embed_workers,
+            upsert_workers=args.upsert_workers,
+        )
+        upsert_seconds = time.perf_counter() - start
+
+    return {
+        "pdfs": args.pdfs,
+        "pages": len(documents),
+        "chunks": len(chunks),
+        "load_seconds": round(load_seconds, 3),
+        "pages_per_sec": round(len(documents) / load_seconds, 2) if load_seconds else None,
+        "split_seconds": round(split_seconds, 3),
+        "embed_upsert_seconds": round(upsert_seconds, 3),
+        "chunks_per_sec": round(len(chunks) / upsert_seconds, 2) if upsert_seconds else None,
+        "upserted": stats.upserted,
+        "retries": stats.retries,
+        "failed": len(stats.failed_ids),
+        "pinecone_requests": dict(pinecone.requests),
+    }
+
+
+def _post(url, query, timeout):
+    data = urllib.parse.urlencode({"query": query}).encode()
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, (time.perf_counter() - start) * 1000
+
+
+def _stream(url, query, timeout):
+    """
+    returns (status, ms to the first token event, ms to the done event)
+    """
+    data = urllib.parse.urlencode({"query": query}).encode()
+    start = time.perf_counter()
+    first_token = None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data), timeout=timeout) as response:
+            for line in response:
+                if first_token is None and line.startswith(b"event: token"):
+                    first_token = (time.perf_counter() - start) * 1000
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, first_token, (time.perf_counter() - start) * 1000
+
+
+def scenario_single(args, base_url, questions):
+    ask, stream_first, stream_total, errors = [], [], [], 0
+    for _ in range(args.repeat):
+        for question in questions:
+            status, ms = _post(f"{base_url}/ask", question, args.timeout)
+            if status == 200:
+                ask.append(ms)
+            else:
+                errors += 1
+            status, first_ms, total_ms = _stream(f"{base_url}/ask/stream", question, args.timeout)
+            if status == 200 and first_ms is not None:
+                stream_first.append(first_ms)
+                stream_total.append(total_ms)
+            else:
+                errors += 1
+    return {
+        "ask": _summary(ask),
+        "stream_first_token": _summary(stream_first),
+        "stream_total": _summary(stream_total),
+        "errors": errors,
+    }
+
+
+def scenario_load(args, base_url, questions):
+    # distinct questions, so single-flight coalescing does not hide the load
+    queries = [f"{questions[n % len(questions)]} ({n})" for n in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(lambda q: _post(f"{base_url}/ask", q, args.timeout), queries))
+    elapsed = time.perf_counter() - start
+
+    ok = [ms for status, ms in outcomes if status == 200]
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "concurrency": args.concurrency,
+        "requests": len(queries),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else None,
+        "latency": _summary(ok),
+        "status_counts": statuses,
+    }
+
+
+@contextlib.contextmanager
+def serve_app():
+    """
+    the real app.py on a werkzeug threaded server; import it only after the environment points at the fakes
+    """
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline end-to-end benchmarks against fake Ollama / Pinecone")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="repeatable; default: all")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own log output")
+    # fake service behaviour
+    parser.add_argument("--dim", type=int, default=1024, help="embedding size (mxbai-embed-large is 1024)")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per embed call")
+    parser.add_argument("--embed-latency-per-text", type=float, default=0.002, help="extra seconds per text")
+    parser.add_argument("--first-token-latency", type=float, default=0.25, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=30.0, help="generation speed")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="tokens per answer")
+    parser.add_argument("--query-latency", type=float, default=0.03, help="pinecone seconds per query")
+    parser.add_argument("--upsert-latency", type=float, default=0.05, help="pinecone seconds per upsert")
+    # ingest
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=25, help="pages per synthetic pdf")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--embed-workers", type=int, default=4)
+    parser.add_argument("--upsert-workers", type=int, default=2)
+    # queries
+    parser.add_argument("--seed-chunks", type=int, default=2000, help="index size when the ingest scenario is skipped")
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the questions in the single scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=48, help="total requests in the load scenario")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--answer-cache", action="store_true", help="keep the semantic answer cache on")
+    parser.add_argument("--embedding-cache", action="store_true", help="keep the on-disk embedding cache on")
+    args = parser.parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+
+    rng = np.random.default_rng(0)
+    ollama = FakeOllama(
+        dim=args.dim,
+        embed_latency=args.embed_latency,
+        embed_latency_per_text=args.embed_latency_per_text,
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+    pinecone = FakePinecone(query_latency=args.query_latency, upsert_latency=args.upsert_latency)
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+        "scenarios": {},
+    }
+
+    with ollama, pinecone, tempfile.TemporaryDirectory() as tmp:
+        # must be in place before rag.runtime / app / populate_database_pc are imported (they read it at import)
+        os.environ.update({
+            "OLLAMA_BASE_URL": ollama.url,
+            "PINECONE_API_KEY": "benchmark",
+            "PINECONE_INDEX_NAME": "benchmark",
+            "PINECONE_INDEX_HOST": pinecone.url,
+            "RAG_VECTOR_BACKEND": "pinecone",
+            "RAG_ANSWER_CACHE": "1" if args.answer_cache else "0",
+            "RAG_EMBEDDING_CACHE": "1" if args.embedding_cache else "0",
+            "RAG_EMBEDDING_CACHE_DIR": os.path.join(tmp, "embedding_cache"),
+            "RAG_INDEX_VERSION_PATH": os.path.join(tmp, "index_version.txt"),
+            # keep the run off the repo's real indexes and don't start a warmup thread against the fake ollama
+            "RAG_LOCAL_INDEX_PATH": os.path.join(tmp, "local_index"),
+            "RAG_LEXICAL_INDEX_PATH": os.path.join(tmp, "lexical_index"),
+            "RAG_WARMUP": "0",
+        })
+        from rag.metrics import METRICS
+
+        log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with log:
+            if "ingest" in scenarios:
+                METRICS.reset()
+                results["scenarios"]["ingest"] = {**scenario_ingest(args, pinecone, rng), "metrics": METRICS.snapshot()}
+            else:
+                seed_index(pinecone, ollama, args.seed_chunks, rng)
+
+            if "single" in scenarios or "load" in scenarios:
+                with serve_app() as base_url:
+                    for name, run in (("single", scenario_single), ("load", scenario_load)):
+                        if name in scenarios:
+                            METRICS.reset()
+                            results["scenarios"][name] = {**run(args, base_url, DEFAULT_QUESTIONS),
+                                                          "metrics": METRICS.snapshot()}
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
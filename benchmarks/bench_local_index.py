@@ -0,0 +1,154 @@
+# latency / recall benchmark: local memory-mapped index vs pinecone
+#
+#   python -m benchmarks.bench_local_index                  # real index: needs Ollama, Pinecone and rag/local_index
+#   python -m benchmarks.bench_local_index --synthetic 5000 # no services: float32 vs int8 on random vectors
+#
+# both modes time a float32 and an int8 copy of the index (real mode builds them in a temp dir from
+# rag/local_index, so the index on disk is left as is).
+# recall@k is measured against the pinecone results (real mode) or the exact float32 results (synthetic mode).
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_QUESTIONS = [
+    "What makes a good mentor?",
+    "What are the qualities of a good mentor for newcomer youth?",
+    "How many young people in Canada report having a mentor?",
+    "What barriers do racialized young adults face in accessing mentoring?",
+    "How can mentoring programs improve match retention?",
+    "What is the mentoring gap?",
+    "How does mentoring affect career pathways?",
+    "What training should mentors receive?",
+]
+
+
+def _timed(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, timings
+
+
+def _summary(timings):
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+    }
+
+
+def _recall(found_ids, expected_ids):
+    expected = set(expected_ids)
+    return len(expected & set(found_ids)) / len(expected) if expected else 1.0
+
+
+def run_synthetic(count, dim, k, queries, repeat):
+    from rag.local_index import LocalVectorStore
+
+    rng = np.random.default_rng(0)
+    # clustered vectors look more like real embeddings than uniform noise
+    centers = rng.normal(size=(32, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, 32, count)] + 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    query_vectors = centers[rng.integers(0, 32, queries)] + 0.5 * rng.normal(size=(queries, dim)).astype(np.float32)
+
+    ids = [f"doc:{i}" for i in range(count)]
+    texts = [""] * count
+    metadatas = [{"id": doc_id} for doc_id in ids]
+
+    results = {"mode": "synthetic", "count": count, "dim": dim, "k": k}
+    exact = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantize in (None, "int8"):
+            name = quantize or "float32"
+            store = LocalVectorStore(path=f"{tmp}/{name}", quantize=quantize)
+            store.upsert_vectors(ids, vectors, texts, metadatas)
+
+            timings, recalls = [], []
+            for q, query in enumerate(query_vectors):
+                (rows, _), t = _timed(lambda: store.top_k(query, k), repeat)
+                timings.extend(t)
+                found = [ids[row] for row in rows]
+                if quantize is None:
+                    exact[q] = found
+                recalls.append(_recall(found, exact[q]))
+            results[name] = {**_summary(timings), f"recall@{k}": round(statistics.fmean(recalls), 4)}
+    return results
+
+
+def run_real(questions, k, repeat, local_index_path):
+    from get_embedding_function import get_embedding_function
+    from rag.local_index import LocalVectorStore
+    from rag.runtime import RagSettings
+    from langchain_pinecone import PineconeVectorStore
+    from pinecone import Pinecone as PineconeClient
+
+    settings = RagSettings.from_env()
+    embedding_function = get_embedding_function()
+    pc = PineconeClient(api_key=settings.pinecone_api_key)
+    pinecone_db = PineconeVectorStore(
+        index=pc.Index(settings.pinecone_index_name), embedding=embedding_function, text_key="text"
+    )
+    source = LocalVectorStore(path=local_index_path, embedding=embedding_function)
+
+    results = {"mode": "real", "questions": len(questions), "k": k, "local_count": len(source.ids),
+               "local_dtype": source.quantize or "float32"}
+    query_vectors = embedding_function.embed_documents(questions)
+
+    pinecone_ids, timings = [], []
+    for vector in query_vectors:
+        found, t = _timed(lambda: pinecone_db.similarity_search_by_vector_with_score(vector, k=k), repeat)
+        timings.extend(t)
+        pinecone_ids.append([doc.metadata.get("id") for doc, _ in found])
+    results["pinecone"] = _summary(timings)
+
+    # an int8 index on disk gives a dequantized float32 copy, see local_dtype
+    vectors = source._float_vectors()
+    with tempfile.TemporaryDirectory() as tmp:
+        for quantize in (None, "int8"):
+            name = quantize or "float32"
+            store = LocalVectorStore(path=f"{tmp}/{name}", embedding=embedding_function, quantize=quantize)
+            store.upsert_vectors(source.ids, vectors, source.texts, source.metadatas)
+
+            timings, recalls = [], []
+            for vector, expected in zip(query_vectors, pinecone_ids):
+                found, t = _timed(lambda: store.similarity_search_by_vector_with_score(vector, k=k), repeat)
+                timings.extend(t)
+                recalls.append(_recall([doc.metadata.get("id") for doc, _ in found], expected))
+            results[f"local_{name}"] = {**_summary(timings),
+                                        f"recall@{k}_vs_pinecone": round(statistics.fmean(recalls), 4)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", type=int, default=0, help="number of random vectors (skips Ollama/Pinecone)")
+    parser.add_argument("--dim", type=int, default=1024, help="vector size for --synthetic (mxbai-embed-large is 1024)")
+    parser.add_argument("--queries", type=int, default=50, help="number of random queries for --synthetic")
+    parser.add_argument("--questions", help="text file with one question per line (real mode)")
+    parser.add_argument("--local-index-path", default="rag/local_index")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per query")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        results = run_synthetic(args.synthetic, args.dim, args.k, args.queries, args.repeat)
+    else:
+        questions = DEFAULT_QUESTIONS
+        if args.questions:
+            with open(args.questions, encoding="utf-8") as f:
+                questions = [line.strip() for line in f if line.strip()]
+        results = run_real(questions, args.k, args.repeat, args.local_index_path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
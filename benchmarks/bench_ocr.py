@@ -0,0 +1,67 @@
+# OCR throughput benchmark on a synthetic multi-page pdf
+#
+#   python -m benchmarks.bench_ocr --pages 24 --workers 1 2 4 8
+#
+# needs the tesseract and poppler binaries (same as rag/apply_ocr.py). prints pages/s per worker count as json.
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+SAMPLE_TEXT = (
+    "Mentoring relationships help young people build skills, confidence and networks. "
+    "Youth with a mentor are more likely to report a sense of belonging and to pursue further education. "
+)
+
+
+def make_synthetic_pdf(path, pages, size=(1700, 2200)):
+    """
+    writes a scanned-looking pdf: every page is an image of text, with no text layer
+    """
+    font = ImageFont.load_default()
+    images = []
+    for page in range(pages):
+        image = Image.new("RGB", size, "white")
+        draw = ImageDraw.Draw(image)
+        y = 100
+        draw.text((100, y), f"Synthetic report - page {page + 1}", fill="black", font=font)
+        while y < size[1] - 150:
+            y += 40
+            draw.text((100, y), SAMPLE_TEXT[(y // 40) % 40:][:90], fill="black", font=font)
+        images.append(image)
+    images[0].save(path, "PDF", resolution=200.0, save_all=True, append_images=images[1:])
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--window", type=int, default=4, help="pages rasterized per task")
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    from rag.ocr_engine import ocr_pdf
+
+    results = {"pages": args.pages, "window": args.window, "dpi": args.dpi, "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        for workers in args.workers:
+            start = time.perf_counter()
+            stats = ocr_pdf(source, os.path.join(tmp, f"out_{workers}.pdf"),
+                            workers=workers, window=args.window, dpi=args.dpi)
+            results["runs"].append({
+                "workers": workers,
+                "seconds": round(time.perf_counter() - start, 3),
+                "pages_per_sec": round(stats.pages_per_sec, 3),
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
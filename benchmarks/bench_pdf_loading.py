@@ -0,0 +1,77 @@
+# PDF loading / splitting throughput of populate_database_pc.py on synthetic text pdfs
+#
+#   python -m benchmarks.bench_pdf_loading --pdfs 16 --pages 25 --workers 1 2 4 8
+#
+# "sequential" is the old path (load every pdf, then split everything); each --workers run streams
+# chunks through stream_chunks(), so first_chunk_seconds is how long the embedding pipeline waits for work.
+# prints pages/s and chunks/s per run as json.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_e2e import make_text_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdfs", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=25, help="pages per synthetic pdf")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import rag.populate_database_pc as populate
+
+    results = {"pdfs": args.pdfs, "pages_per_pdf": args.pages, "cpu_count": os.cpu_count(), "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(args.seed)
+        paths = [make_text_pdf(os.path.join(tmp, f"Synthetic_{n}_ocr.pdf"), args.pages, rng)
+                 for n in range(args.pdfs)]
+        pages = args.pdfs * args.pages
+
+        # load_documents prints a summary line, keep the output valid json
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            chunks = populate.calculate_chunk_ids(populate.split_documents(populate.load_documents(paths)))
+            seconds = time.perf_counter() - start
+        results["runs"].append({
+            "mode": "sequential",
+            "workers": 1,
+            "chunks": len(chunks),
+            "first_chunk_seconds": round(seconds, 3),
+            "seconds": round(seconds, 3),
+            "pages_per_sec": round(pages / seconds, 2),
+            "chunks_per_sec": round(len(chunks) / seconds, 2),
+        })
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            first_chunk = None
+            count = 0
+            for _ in populate.stream_chunks(paths, workers=workers):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                count += 1
+            seconds = time.perf_counter() - start
+            results["runs"].append({
+                "mode": "streaming",
+                "workers": workers,
+                "chunks": count,
+                "first_chunk_seconds": round(first_chunk or seconds, 3),
+                "seconds": round(seconds, 3),
+                "pages_per_sec": round(pages / seconds, 2),
+                "chunks_per_sec": round(count / seconds, 2),
+            })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
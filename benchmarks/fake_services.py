@@ -0,0 +1,289 @@
+# in-process stand-ins for Ollama and the Pinecone data plane, for benchmarking without live services.
+# both speak just enough of the real HTTP APIs for the ollama / pinecone python clients used by the app:
+#
+#   ollama:   POST /api/embed, POST /api/embeddings, POST /api/generate (streamed NDJSON or one JSON), GET /api/tags
+#   pinecone: POST /vectors/upsert, POST /query, POST /vectors/delete, GET|POST /describe_index_stats
+#
+# latency is simulated with sleeps (configurable per call, per text and per generated token), so the numbers
+# measure our own code plus a controlled, repeatable service time.
+#
+#   with FakeOllama(tokens_per_second=40) as ollama, FakePinecone() as pinecone:
+#       os.environ["OLLAMA_BASE_URL"] = ollama.url
+#       os.environ["PINECONE_INDEX_HOST"] = pinecone.url
+
+import json
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+ANSWER_WORDS = (
+    "Mentors who listen , set clear expectations and stay consistent over time help young people build "
+    "confidence [1] . Programs that train and support their mentors keep matches going longer [2] , and "
+    "newcomer youth benefit from mentors who understand their context [1] [3] ."
+).split()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # keep benchmark output clean
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.service.handle(self, "GET", self.path.split("?")[0], None)
+
+    def do_POST(self):
+        self.server.service.handle(self, "POST", self.path.split("?")[0], self._read_json())
+
+
+class _FakeService:
+    """
+    runs a ThreadingHTTPServer on a free localhost port in a background thread
+    """
+
+    def __init__(self):
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.requests = {}
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.service = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, route):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def handle(self, handler, method, path, body):
+        route = self.routes().get((method, path))
+        if route is None:
+            handler._send_json({"error": f"no route {method} {path}"}, status=404)
+            return
+        self._count(path)
+        route(handler, body)
+
+    def routes(self):
+        return {}
+
+
+class FakeOllama(_FakeService):
+    """
+    deterministic hashed bag-of-words embeddings (texts sharing words get similar vectors, so retrieval
+    still returns related chunks) and a canned answer streamed at a fixed token rate
+    """
+
+    def __init__(self, dim=1024, embed_latency=0.02, embed_latency_per_text=0.002,
+                 first_token_latency=0.25, tokens_per_second=30.0, completion_tokens=120):
+        super().__init__()
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.embed_latency_per_text = embed_latency_per_text
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self._word_vectors = {}
+
+    def routes(self):
+        return {
+            ("POST", "/api/embed"): self._embed,
+            ("POST", "/api/embeddings"): self._embeddings,
+            ("POST", "/api/generate"): self._generate,
+            ("GET", "/api/tags"): self._tags,
+        }
+
+    def _word_vector(self, word):
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode()))
+            vector = self._word_vectors[word] = rng.standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def embed_text(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            vector += self._word_vector(word)
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def _embed(self, handler, body):
+        texts = body.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        time.sleep(self.embed_latency + self.embed_latency_per_text * len(texts))
+        handler._send_json({"model": body.get("model"), "embeddings": [self.embed_text(t) for t in texts]})
+
+    def _embeddings(self, handler, body):
+        # legacy single-prompt endpoint
+        time.sleep(self.embed_latency + self.embed_latency_per_text)
+        handler._send_json({"embedding": self.embed_text(body.get("prompt") or "")})
+
+    def _tags(self, handler, body):
+        handler._send_json({"models": [{"name": "mistral:latest"}, {"name": "mxbai-embed-large:latest"}]})
+
+    def _chunk(self, model, text, done, **extra):
+        return {"model": model, "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": text, "done": done, **extra}
+
+    def _generate(self, handler, body):
+        model = body.get("model")
+        if not body.get("prompt"):
+            # like ollama: an empty prompt only loads the model
+            handler._send_json(self._chunk(model, "", True, done_reason="load"))
+            return
+        limit = (body.get("options") or {}).get("num_predict") or self.completion_tokens
+        count = self.completion_tokens if limit < 0 else min(limit, self.completion_tokens)
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(count)]
+        prompt_tokens = max(1, len(body.get("prompt") or "") // 4)
+        totals = {"done_reason": "stop", "prompt_eval_count": prompt_tokens, "eval_count": count}
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+        time.sleep(self.first_token_latency)
+        if body.get("stream", True) is False:
+            time.sleep(per_token * count)
+            handler._send_json(self._chunk(model, " ".join(words), True, **totals))
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write(payload):
+            line = (json.dumps(payload) + "\n").encode()
+            handler.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            handler.wfile.flush()
+
+        try:
+            for number, word in enumerate(words):
+                write(self._chunk(model, word if number == 0 else f" {word}", False))
+                time.sleep(per_token)
+            write(self._chunk(model, "", True, **totals))
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the client stopped reading (e.g. /ask/stream disconnect)
+            handler.close_connection = True
+
+
+class FakePinecone(_FakeService):
+    """
+    exact cosine search over an in-memory matrix, one namespace
+    """
+
+    def __init__(self, query_latency=0.03, upsert_latency=0.05, delete_latency=0.01):
+        super().__init__()
+        self.query_latency = query_latency
+        self.upsert_latency = upsert_latency
+        self.delete_latency = delete_latency
+        self._records = {}  # id -> (vector, metadata)
+        self._matrix = None
+        self._ids = []
+
+    def routes(self):
+        return {
+            ("POST", "/vectors/upsert"): self._upsert,
+            ("POST", "/query"): self._query,
+            ("POST", "/vectors/delete"): self._delete,
+            ("POST", "/describe_index_stats"): self._stats,
+            ("GET", "/describe_index_stats"): self._stats,
+        }
+
+    def upsert(self, records):
+        with self._lock:
+            for record in records:
+                self._records[record["id"]] = (np.asarray(record["values"], dtype=np.float32),
+                                               record.get("metadata") or {})
+            self._matrix = None
+
+    def _search_matrix(self):
+        with self._lock:
+            if self._matrix is None:
+                self._ids = list(self._records)
+                vectors = [self._records[i][0] for i in self._ids]
+                matrix = np.stack(vectors) if vectors else np.zeros((0, 1), dtype=np.float32)
+                norms = np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+                self._matrix = matrix / norms
+            return self._matrix, self._ids
+
+    def _upsert(self, handler, body):
+        time.sleep(self.upsert_latency)
+        records = body.get("vectors") or []
+        self.upsert(records)
+        handler._send_json({"upsertedCount": len(records)})
+
+    def _query(self, handler, body):
+        time.sleep(self.query_latency)
+        matrix, ids = self._search_matrix()
+        top_k = int(body.get("topK") or 10)
+        matches = []
+        if len(ids):
+            query = np.asarray(body.get("vector") or [], dtype=np.float32)
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+            scores = matrix @ query
+            for row in np.argsort(-scores)[:top_k]:
+                vector, metadata = self._records[ids[row]]
+                match = {"id": ids[row], "score": float(scores[row])}
+                if body.get("includeValues"):
+                    match["values"] = vector.tolist()
+                if body.get("includeMetadata"):
+                    match["metadata"] = metadata
+                matches.append(match)
+        handler._send_json({"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 5}})
+
+    def _delete(self, handler, body):
+        time.sleep(self.delete_latency)
+        with self._lock:
+            if body.get("deleteAll"):
+                self._records.clear()
+            for record_id in body.get("ids") or []:
+                self._records.pop(record_id, None)
+            self._matrix = None
+        handler._send_json({})
+
+    def _stats(self, handler, body):
+        with self._lock:
+            count = len(self._records)
+            dim = len(next(iter(self._records.values()))[0]) if count else 0
+        handler._send_json({"namespaces": {"": {"vectorCount": count}}, "dimension": dim,
+                            "indexFullness": 0.0, "totalVectorCount": count})
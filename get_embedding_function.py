@@ -1,16 +1,30 @@
 # make sure to pip install langchain-community
 
-from langchain_ollama import OllamaEmbeddings
-
-# for later (web deployment), will need to set up credentials and paid service (GPT)
-# encoder
 import os
-from getpass import getpass
+
+# for later (web deployment), will need to set up credentials and paid service (GPT) encoder.
+# imported only then: langchain_openai is slow to import and unused by the Ollama path
+# from getpass import getpass
 # remember to pip install -qU langchain-openai
-from langchain_openai import OpenAIEmbeddings
+# from langchain_openai import OpenAIEmbeddings
+
+from rag.embedding_cache import CachedEmbeddings
+from rag.ollama_client import OllamaSettings, ollama_embeddings
 
-def get_embedding_function():
-    embeddings = OllamaEmbeddings(model="mxbai-embed-large")
+EMBEDDING_MODEL = "mxbai-embed-large"
+
+
+def get_embedding_function(ollama_settings: OllamaSettings | None = None, cache=True):
+    # pooled client, timeouts, retries and keep_alive from OLLAMA_* / RAG_OLLAMA_KEEP_ALIVE (see rag/ollama_client.py)
+    embeddings = ollama_embeddings(EMBEDDING_MODEL, ollama_settings)
     # os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY") or getpass("Enter your OpenAI API key: ")
     # embeddings = OpenAIEmbeddings(name="text-embedding-3-large")
-    return embeddings
\ No newline at end of file
+
+    # unchanged text is served from the on-disk cache instead of being re-embedded by Ollama
+    if cache and os.getenv("RAG_EMBEDDING_CACHE", "1") == "1":
+        embeddings = CachedEmbeddings(
+            embeddings,
+            model_name=EMBEDDING_MODEL,
+            cache_dir=os.getenv("RAG_EMBEDDING_CACHE_DIR", "rag/embedding_cache"),
+        )
+    return embeddings
@@ -0,0 +1,149 @@
+# in-memory cache for the site's static pages (home, about, insights, model).
+# the templates have no per-request data, so each one is rendered once, compressed once (gzip, plus brotli
+# when the package is installed) and then served straight from memory with a strong ETag; a browser that
+# already has the page gets an empty 304. in dev mode (debug / TEMPLATES_AUTO_RELOAD) a page is re-rendered
+# when its template or one of the static files it links to changes.
+#
+# static asset urls from url_for('static', ...) get a content fingerprint (?v=<sha256 prefix>), and responses
+# for a url whose fingerprint matches the file are marked immutable for a year: a changed file gets a new url.
+
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import Response, current_app, g, render_template, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    # optional, gzip is always available
+    brotli = None
+
+PAGE_CACHE_CONTROL = "no-cache"  # always revalidate, which costs a 304 at most
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _file_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PageCache:
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._pages = {}         # template name -> entry
+        self._fingerprints = {}  # static filename -> ((mtime, size), digest)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.url_defaults(self._add_fingerprint)
+        app.after_request(self._static_cache_headers)
+        app.extensions["page_cache"] = self
+
+    # ---------------------------------------------------
+    # static asset fingerprints
+    # ---------------------------------------------------
+    def fingerprint(self, filename):
+        path = safe_join(current_app.static_folder, filename)
+        key = _file_key(path) if path else None
+        if key is None:
+            return None
+        known = self._fingerprints.get(filename)
+        if known is None or known[0] != key:
+            with open(path, "rb") as f:
+                known = self._fingerprints[filename] = (key, hashlib.sha256(f.read()).hexdigest()[:12])
+        return known[1]
+
+    def _add_fingerprint(self, endpoint, values):
+        if endpoint != "static" or "filename" not in values or "v" in values:
+            return
+        version = self.fingerprint(values["filename"])
+        if version:
+            values["v"] = version
+            # remembered so dev mode can tell when a page links to a changed file
+            assets = g.get("page_assets")
+            if assets is not None:
+                assets[values["filename"]] = self._fingerprints[values["filename"]][0]
+
+    def _static_cache_headers(self, response):
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            version = request.args.get("v")
+            if version and version == self.fingerprint(request.view_args["filename"]):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    # ---------------------------------------------------
+    # pages
+    # ---------------------------------------------------
+    def _is_current(self, entry):
+        if not current_app.jinja_env.auto_reload:
+            return True
+        if not entry["template"].is_up_to_date:
+            return False
+        return all(
+            _file_key(safe_join(current_app.static_folder, filename)) == key
+            for filename, key in entry["assets"].items()
+        )
+
+    def _render(self, name):
+        g.page_assets = {}
+        body = render_template(name).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # one strong ETag per representation
+        variants = {None: (body, digest), "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f"{digest}-gzip")}
+        if brotli is not None:
+            variants["br"] = (brotli.compress(body, quality=11), f"{digest}-br")
+        return {
+            "template": current_app.jinja_env.get_template(name),
+            "assets": g.pop("page_assets"),
+            "variants": variants,
+        }
+
+    def _entry(self, name):
+        entry = self._pages.get(name)
+        if entry is not None and self._is_current(entry):
+            return entry
+        with self._lock:
+            entry = self._pages.get(name)
+            if entry is None or not self._is_current(entry):
+                entry = self._pages[name] = self._render(name)
+            return entry
+
+    def _choose_encoding(self, variants):
+        accepted = request.accept_encodings
+        for encoding in ("br", "gzip"):
+            if encoding in variants and accepted[encoding]:
+                return encoding
+        return None
+
+    def render(self, name):
+        """
+        the cached page as a response: 304 when the client's copy is current, otherwise the best encoding
+        """
+        variants = self._entry(name)["variants"]
+        encoding = self._choose_encoding(variants)
+        body, etag = variants[encoding]
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="text/html")
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = PAGE_CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._fingerprints.clear()
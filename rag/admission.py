@@ -0,0 +1,155 @@
+# request coalescing and admission control for the /ask path.
+# - SingleFlight: concurrent identical questions share one in-flight computation instead of each running
+#   their own embedding + vector search + LLM generation.
+# - AdmissionGate: bounds how many LLM generations run at once. extra requests wait in a bounded queue for
+#   a limited time; when the queue is full (or the wait runs out) they are turned away immediately with a
+#   retry hint instead of piling onto Ollama.
+
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """
+    raised when the LLM queue is saturated; retry_after is a suggested wait in seconds
+    """
+
+    def __init__(self, retry_after, reason="busy"):
+        super().__init__(f"RAG service is {reason}, retry in {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def normalize_query(query_text):
+    # "What makes a good mentor?" and "what makes a  good mentor" are the same question
+    return re.sub(r"\s+", " ", (query_text or "").lower()).strip().rstrip("?.! ")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        runs fn() once per key at a time; callers arriving while it runs get the same result (or exception)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class AdmissionGate:
+
+    def __init__(self, max_concurrent=2, max_queue=16, max_wait=20.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # recent waits and generation times, for percentiles and the retry hint
+        self._waits = deque(maxlen=1024)
+        self._service_times = deque(maxlen=256)
+
+    def _retry_after(self):
+        # rough time until the queue ahead of a new request drains
+        avg_service = (sum(self._service_times) / len(self._service_times)) if self._service_times else 5.0
+        estimate = avg_service * (self.waiting + 1) / self.max_concurrent
+        return max(1, min(60, round(estimate)))
+
+    @contextmanager
+    def slot(self):
+        """
+        holds one LLM slot for the duration of the with-block, or raises Overloaded
+        """
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(self._retry_after(), "at capacity")
+            self.waiting += 1
+
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.max_wait)
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self.waiting -= 1
+            self._waits.append(waited)
+            if not acquired:
+                self.timed_out += 1
+                raise Overloaded(self._retry_after(), "busy")
+            self.running += 1
+            self.admitted += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+                self._service_times.append(time.perf_counter() - start)
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            percentile = lambda q: waits[int(q * (len(waits) - 1))] if waits else 0.0
+            return {
+                "running": self.running,
+                "queue_depth": self.waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_p50_seconds": percentile(0.5),
+                "wait_p95_seconds": percentile(0.95),
+                "wait_max_seconds": waits[-1] if waits else 0.0,
+            }
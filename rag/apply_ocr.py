@@ -1,108 +1,252 @@
+
 # for OCR
-import pathlib
+import argparse
+import json
+import os
+import shutil
+import time
 from pathlib import Path
 
-from pdf2image import convert_from_path
-
 # to iterate over multiple PDF files
 from glob import glob
 
-# for creating a text selectable pdf
-import pytesseract
-from pypdf import PdfWriter
-
-
-# convert pdf to png
-def pdf_to_image(pdf_path, output_folder="rag/pdf_images"):
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+
+# parallel, page-windowed OCR (see rag/ocr_engine.py)
+from rag.ingest_manifest import file_hash
+from rag.ocr_engine import OcrStats, make_executor, merge_pages, ocr_pages
+from rag.page_classifier import classify_pages
+
+# resumable OCR of rag/raw_pdfs into rag/processed_pdfs
+#
+#   python -m rag.apply_ocr                      # process whatever is new, changed or unfinished
+#   python -m rag.apply_ocr --only Who-Mentored-You --jobs 4
+#   python -m rag.apply_ocr --dry-run            # show the planned work, change nothing
+#
+# progress is checkpointed per page in <work dir>/manifest.json:
+#   {stem: {"source", "sha256", "size", "mtime", "pages": {"1": "text" | "pending" | "ocr", ...},
+#           "merged": {"size", "mtime"} | null}}
+# "text" pages keep their own text layer, "pending" pages still need OCR and "ocr" pages are done, with their
+# searchable pdf saved as <work dir>/<stem>/page_<n>.pdf until the merge. rasterizing and OCR run in the same
+# worker step and the page images never touch disk, so the OCR'd page is the checkpoint. after a crash the next
+# run only redoes "pending" pages; when a source pdf changes (size/mtime, confirmed by sha256) that document
+# starts over.
+
+RAW_PDF_FOLDER = "rag/raw_pdfs"
+OUTPUT_FOLDER = "rag/processed_pdfs"
+WORK_FOLDER = "rag/ocr_work"
+
+
+def load_manifest(work_folder):
+    path = Path(work_folder) / "manifest.json"
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, work_folder):
+    path = Path(work_folder) / "manifest.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _source_changed(entry, pdf_path):
     """
-    function to convert pdfs to images
+    cheap size/mtime check first, the hash only when those moved (e.g. the file was touched or copied)
     """
-    pdf_path = Path(pdf_path)
-    output_folder = Path(output_folder)
-    output_folder.mkdir(parents=True, exist_ok=True)
-
-    # Get base name (e.g., "mentoring_report" from "mentoring_report.pdf")
-    base_name = pdf_path.stem
-    expected_first_image = output_folder / f"{base_name}_page_1.png"
-
-    if expected_first_image.exists():
-        print(f"✅ Skipping {pdf_path.name} (already converted)")
-        return 0
-
-    # Convert PDF to list of images (one per page)
-    images = convert_from_path(str(pdf_path))
-
-    for i, img in enumerate(images):
-        output_file = output_folder / f"{base_name}_page_{i+1}.png"
-        img.save(output_file, "PNG")
-
-    print(f"✅ Converted {pdf_path.name} ({len(images)} pages)")
-    return len(images)
-
-# convert all existing items in the folder
-ALL_PDF_PATHS = glob("rag/raw_pdfs/*.pdf")
-
-from pdf2image.exceptions import PDFPageCountError
-
-for pdf_file in ALL_PDF_PATHS:
-
-    try:
-        print(f"Processing: {pdf_file}")
-        pdf_to_image(pdf_path=pdf_file, output_folder="rag/pdf_images")
-    except PDFPageCountError:
-        print(f"❌ Skipping unreadable PDF: {pdf_file}")
-    except Exception as e:
-        print(f"❌ Unexpected error with {pdf_file}: {e}")
+    stat = os.stat(pdf_path)
+    if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+        return False
+    if entry.get("sha256") == file_hash(pdf_path):
+        entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime_ns
+        return False
+    return True
 
-print(f"Successfully converted {len(ALL_PDF_PATHS)} pdf files into png images :)")
 
+def _output_current(entry, output_pdf):
+    merged = entry.get("merged")
+    if not merged or not output_pdf.exists():
+        return False
+    stat = output_pdf.stat()
+    return merged["size"] == stat.st_size and merged["mtime"] == stat.st_mtime_ns
 
-# conversion into text selectable pdfs
-def ocr_images_to_searchable_pdf(stem=None, image_folder="rag/pdf_images", output_folder="rag/processed_pdfs"):
-    
-    image_folder=Path(image_folder)
-    output_folder=Path(output_folder)
 
-    page_images = sorted(
-        image_folder.glob(f"{stem}_page_*.png"),
-        key=lambda p: int(p.stem.split('_')[-1])
+def plan_document(manifest, pdf_path, output_pdf, force=False, work_folder=WORK_FOLDER):
+    """
+    brings the manifest entry of one pdf up to date and returns (action, entry):
+    "skip" (output is current), "merge" (all pages done, output missing or stale) or "ocr" (pages pending)
+    """
+    stem = Path(pdf_path).stem
+    entry = manifest.get(stem)
+
+    if entry is None or force or _source_changed(entry, pdf_path):
+        # every page starts over as "text" / "pending", so checkpoints left from an older version
+        # of this pdf are never merged, they just get overwritten
+        stat = os.stat(pdf_path)
+        entry = {
+            "source": str(pdf_path),
+            "sha256": file_hash(pdf_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "pages": {
+                str(number + 1): "pending" if needed else "text"
+                for number, needed in enumerate(classify_pages(pdf_path))
+            },
+            "merged": None,
+        }
+        manifest[stem] = entry
+
+    if not any(state == "pending" for state in entry["pages"].values()) and _output_current(entry, output_pdf):
+        return "skip", entry
+
+    # the page checkpoints are deleted after a merge, so when the output is gone or stale the OCR'd pages
+    # have to be redone
+    page_folder = Path(work_folder) / stem
+    for number, state in entry["pages"].items():
+        if state == "ocr" and not (page_folder / f"page_{number}.pdf").exists():
+            entry["pages"][number] = "pending"
+
+    if any(state == "pending" for state in entry["pages"].values()):
+        return "ocr", entry
+    return "merge", entry
+
+
+def process_document(stem, entry, output_pdf, work_folder, executor, manifest, window=4):
+    """
+    OCRs the pending pages of one pdf and merges the output; returns the OcrStats of this run
+    """
+    start = time.perf_counter()
+    pdf_path = entry["source"]
+    page_folder = Path(work_folder) / stem
+    page_folder.mkdir(parents=True, exist_ok=True)
+
+    pending = [int(number) for number, state in entry["pages"].items() if state == "pending"]
+    if pending:
+        print(f"🔄 OCR {stem}: {len(pending)} pages to go")
+        for number, page_pdf in ocr_pages(pdf_path, pending, executor, window=window):
+            page_file = page_folder / f"page_{number}.pdf"
+            tmp_file = page_folder / f"page_{number}.pdf.part"
+            tmp_file.write_bytes(page_pdf)
+            os.replace(tmp_file, page_file)
+            # checkpoint after every page so a crash loses at most the windows still in flight
+            entry["pages"][str(number)] = "ocr"
+            save_manifest(manifest, work_folder)
+
+    source_pages = PdfReader(pdf_path).pages
+    merged = merge_pages([
+        (page_folder / f"page_{number}.pdf").read_bytes() if entry["pages"][str(number)] == "ocr"
+        else source_pages[number - 1]
+        for number in range(1, len(entry["pages"]) + 1)
+    ])
+    tmp_output = output_pdf.with_suffix(".pdf.part")
+    tmp_output.write_bytes(merged)
+    os.replace(tmp_output, output_pdf)
+
+    stat = output_pdf.stat()
+    entry["merged"] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+    save_manifest(manifest, work_folder)
+    # the merged pdf now holds every page; the per-page checkpoints are no longer needed
+    shutil.rmtree(page_folder, ignore_errors=True)
+
+    stats = OcrStats(
+        pdf=output_pdf.name,
+        pages=len(entry["pages"]),
+        seconds=time.perf_counter() - start,
+        pages_ocr=len(pending),
+        pages_skipped=sum(1 for state in entry["pages"].values() if state == "text"),
     )
+    print(f"✅ {stats.summary()}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR raw pdfs into text-selectable pdfs, resuming unfinished work.")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="OCR worker processes")
+    parser.add_argument("--only", action="append", metavar="STEM",
+                        help="only process this pdf (file name without .pdf); repeatable")
+    parser.add_argument("--dry-run", action="store_true", help="print the planned work and exit")
+    parser.add_argument("--force", action="store_true", help="redo the selected pdfs from scratch")
+    parser.add_argument("--window", type=int, default=4, help="pages rasterized per worker task")
+    parser.add_argument("--raw-folder", default=RAW_PDF_FOLDER)
+    parser.add_argument("--output-folder", default=OUTPUT_FOLDER)
+    parser.add_argument("--work-folder", default=WORK_FOLDER)
+    args = parser.parse_args()
+
+    output_folder = Path(args.output_folder)
+
+    pdf_paths = sorted(glob(f"{args.raw_folder}/*.pdf"))
+    if args.only:
+        only = set(args.only)
+        pdf_paths = [path for path in pdf_paths if Path(path).stem in only]
+        missing = only - {Path(path).stem for path in pdf_paths}
+        for stem in sorted(missing):
+            print(f"❌ No such pdf: {args.raw_folder}/{stem}.pdf")
+
+    manifest = load_manifest(args.work_folder)
+    plan = []
+    for pdf_file in pdf_paths:
+        stem = Path(pdf_file).stem
+        output_pdf = output_folder / f"{stem}_ocr.pdf"
+        try:
+            action, entry = plan_document(manifest, pdf_file, output_pdf, force=args.force,
+                                          work_folder=args.work_folder)
+        except PyPdfError:
+            # planning reads the pdf with pypdf (classify_pages)
+            print(f"❌ Skipping unreadable PDF: {pdf_file}")
+            continue
+        except Exception as e:
+            print(f"❌ Unexpected error with {pdf_file}: {e}")
+            continue
+        plan.append((stem, action, entry, output_pdf))
+
+    pages_left = 0
+    for stem, action, entry, _ in plan:
+        pending = sum(1 for state in entry["pages"].values() if state == "pending")
+        pages_left += pending
+        if action == "skip":
+            print(f"✅ {stem}: up to date")
+        elif action == "merge":
+            print(f"📄 {stem}: re-merge only ({len(entry['pages'])} pages)")
+        else:
+            print(f"🔄 {stem}: {pending} of {len(entry['pages'])} pages to OCR")
+    print(f"{sum(1 for p in plan if p[1] != 'skip')} of {len(plan)} pdfs need work, {pages_left} pages to OCR")
+
+    if args.dry_run:
+        return
+    output_folder.mkdir(parents=True, exist_ok=True)
+    Path(args.work_folder).mkdir(parents=True, exist_ok=True)
+    # the refreshed source hashes / page classes are worth keeping even if nothing else runs
+    save_manifest(manifest, args.work_folder)
 
-    if not page_images:
-            print(f"No images found for stem: {stem}")
-            return
-
-    merger = PdfWriter()
-
-    for img_path in page_images:
-        raw_pdf = pytesseract.image_to_pdf_or_hocr(str(img_path), extension="pdf")
-
-        temp_pdf_path = img_path.parent / f"__temp_{img_path.stem}.pdf"
-
-        with open(temp_pdf_path, "wb") as f:
-            f.write(raw_pdf)
-
-        merger.append(str(temp_pdf_path))
-        temp_pdf_path.unlink()  # deletes temp file to keep script clean
-    
-    output_pdf =output_folder /f"{stem}_ocr.pdf"
-    merger.write(str(output_pdf))
-    merger.close()
-
-image_folder = Path("rag/pdf_images")
-output_folder = Path("rag/processed_pdfs")
-output_folder.mkdir(parents=True, exist_ok=True)
-
-# Find all _page_1.png files to get one entry per document
-unique_page_ones = image_folder.glob("*_page_1.png")
-stems = [p.stem.rsplit("_page_", 1)[0] for p in unique_page_ones]
-
-for stem in stems:
+    start = time.perf_counter()
+    done = []
+    executor = make_executor(args.jobs) if pages_left else None
     try:
-        print(f"🔄 Processing: {stem}")
-        ocr_images_to_searchable_pdf(stem, image_folder=image_folder, output_folder=output_folder)
-    except Exception as e:
-        print(f"❌ Error with {stem}: {e}")
-print(f"Successfully created {len(stems)} searchable text pdfs :)")
-
-
+        for stem, action, entry, output_pdf in plan:
+            if action == "skip":
+                continue
+            try:
+                done.append(process_document(stem, entry, output_pdf, args.work_folder, executor, manifest,
+                                             window=args.window))
+            except Exception as e:
+                # finished pages stay checkpointed, the next run picks up from there
+                print(f"❌ Error with {stem}: {e}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    seconds = time.perf_counter() - start
+    total_pages = sum(stats.pages for stats in done)
+    rate = total_pages / seconds if seconds else 0.0
+    print(f"Successfully created {len(done)} searchable text pdfs ({total_pages} pages, {rate:.2f} pages/s) :)")
+    print(f"OCR'd {sum(stats.pages_ocr for stats in done)} pages, kept the text layer of "
+          f"{sum(stats.pages_skipped for stats in done)} pages (~{sum(stats.seconds_saved for stats in done):.0f}s saved)")
+
+
+# nothing runs on import; worker processes also re-import this module on platforms that spawn instead of fork
+if __name__ == "__main__":
+    main()
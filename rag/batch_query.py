@@ -0,0 +1,220 @@
+# batch mode for evaluation runs: many questions through the RAG path at once.
+# instead of embed -> search -> generate per question, one after the other:
+#   1. every question is embedded in a single embed_documents call
+#   2. answer cache lookups and vector searches run concurrently (they are I/O bound)
+#   3. generations go through a bounded pool and the shared LLM gate, so a batch never
+#      oversubscribes Ollama; by default it uses one slot less than the gate has, leaving one for /ask users
+# results come out as soon as they are ready (not in input order), each with per-stage timings.
+#
+#   python -m rag.batch_query questions.jsonl -o answers.jsonl
+#   cat questions.txt | python -m rag.batch_query - --llm-workers 2
+#
+# input lines are JSON strings, {"id": ..., "question": ...} objects, or plain text (one question per line).
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from rag.admission import Overloaded
+from rag.context_builder import estimate_tokens
+from rag.citations import with_references
+from rag.index_version import read_index_version
+from rag.metrics import METRICS
+from rag.ollama_client import is_transient
+from rag.query_data_pc import (build_prompt, lookup_cached_answer, record_generation, retrieve, source_metadata,
+                               store_answer)
+from rag.runtime import RagRuntime, get_runtime
+
+
+def parse_questions(items):
+    """
+    accepts strings or {"id", "question" | "query"} dicts; returns [{"id", "question"}]
+    """
+    questions = []
+    for number, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"question": item}
+        elif not isinstance(item, dict):
+            raise ValueError(f"item {number}: expected a string or an object, got {type(item).__name__}")
+        question = item.get("question") or item.get("query")
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError(f"item {number}: missing question")
+        questions.append({"id": item.get("id", number), "question": question.strip()})
+    return questions
+
+
+def read_questions(lines):
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError:
+            # plain text file, one question per line
+            items.append(line)
+    return parse_questions(items)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def _search(item, runtime: RagRuntime, index_version):
+    start = time.perf_counter()
+    cached = lookup_cached_answer(item["vector"], index_version, runtime)
+    item["timings"]["cache_ms"] = _ms(time.perf_counter() - start)
+    if cached is not None:
+        item["answer"], item["sources"], item["cached"] = cached["answer"], cached["sources"], True
+        return item
+
+    start = time.perf_counter()
+    item["results"] = retrieve(item["vector"], runtime, item["question"])
+    item["sources"] = source_metadata(item["results"])
+    item["timings"]["search_ms"] = _ms(time.perf_counter() - start)
+    item["ready"] = time.perf_counter()
+    return item
+
+
+def _generate(item, runtime: RagRuntime, index_version, max_overloaded_retries=5):
+    # the gate is shared with the web app; a busy gate means waiting our turn, not failing the item
+    for attempt in range(max_overloaded_retries + 1):
+        try:
+            with runtime.llm_gate.slot():
+                item["timings"]["queue_ms"] = _ms(time.perf_counter() - item["ready"])
+                prompt = build_prompt(item["question"], item["results"], runtime)
+                start = time.perf_counter()
+                answer = runtime.model.invoke(prompt)
+                generation_seconds = time.perf_counter() - start
+            break
+        except Overloaded as e:
+            if attempt == max_overloaded_retries:
+                raise
+            time.sleep(e.retry_after)
+
+    record_generation(generation_seconds, estimate_tokens(answer))
+    item["timings"]["generation_ms"] = _ms(generation_seconds)
+    item["answer"] = with_references(answer, item["results"])
+    item["cached"] = False
+    store_answer(item["question"], item["vector"], item["answer"], item["results"], index_version, runtime)
+    return item
+
+
+def _result(item, error=None):
+    item["timings"]["total_ms"] = _ms(time.perf_counter() - item["start"])
+    outcome = "error" if error else "cache_hit" if item.get("cached") else "generated"
+    METRICS.inc("rag_requests_total", mode="batch", outcome=outcome)
+    result = {
+        "id": item["id"],
+        "question": item["question"],
+        "answer": item.get("answer"),
+        "sources": item.get("sources", []),
+        "cached": item.get("cached", False),
+        "timings": item["timings"],
+    }
+    if error:
+        result["error"] = str(error)
+    return result
+
+
+def answer_batch(questions, runtime: RagRuntime | None = None, search_workers=8, llm_workers=None):
+    """
+    questions: output of parse_questions. yields one result dict per question, in completion order.
+    closing the generator cancels the work that has not started yet.
+    """
+    if runtime is None:
+        runtime = get_runtime()
+    if not questions:
+        return
+    # the gate is not fair, so a batch holding every slot would push /ask requests into their timeout
+    llm_workers = llm_workers or max(1, runtime.settings.llm_max_concurrency - 1)
+    start = time.perf_counter()
+    index_version = read_index_version()
+    runtime.refresh(index_version)
+
+    # one embedding call for the whole batch (none in lexical mode)
+    if runtime.lexical is not None and runtime.settings.retrieval_mode == "lexical":
+        vectors = [None] * len(questions)
+    else:
+        try:
+            with METRICS.span("embed", mode="batch"):
+                vectors = runtime.embedding_function.embed_documents([q["question"] for q in questions])
+        except Exception as e:
+            # same rule as embed_query: only a slow / unreachable embedding service falls back to BM25
+            if runtime.lexical is None or not (isinstance(e, TimeoutError) or is_transient(e)):
+                raise
+            print(f"❌ Batch embedding failed ({e!r}), answering from the lexical index")
+            METRICS.inc("rag_lexical_fallback_total", reason="error")
+            vectors = [None] * len(questions)
+    embed_ms = _ms(time.perf_counter() - start)
+
+    items = [
+        {**q, "vector": vector, "start": start, "timings": {"embed_batch_ms": embed_ms}}
+        for q, vector in zip(questions, vectors)
+    ]
+
+    search_pool = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix="batch-search")
+    llm_pool = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="batch-llm")
+    try:
+        pending = {search_pool.submit(_search, item, runtime, index_version): ("search", item) for item in items}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item = pending.pop(future)
+                try:
+                    item = future.result()
+                except Exception as e:
+                    print(f"❌ Batch item {item['id']} failed during {stage}: {e}")
+                    yield _result(item, error=e)
+                    continue
+                if stage == "search" and not item.get("cached"):
+                    if not item["results"]:
+                        yield _result(item, error="no relevant documents retrieved")
+                    else:
+                        pending[llm_pool.submit(_generate, item, runtime, index_version)] = ("generation", item)
+                    continue
+                yield _result(item)
+    finally:
+        search_pool.shutdown(wait=False, cancel_futures=True)
+        llm_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions, writing JSONL results as they finish.")
+    parser.add_argument("questions", help="JSONL / text file with one question per line, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--search-workers", type=int, default=8, help="concurrent cache lookups / vector queries")
+    parser.add_argument("--llm-workers", type=int, default=None,
+                        help="concurrent generations (default: RAG_LLM_MAX_CONCURRENCY - 1)")
+    args = parser.parse_args()
+
+    if args.questions == "-":
+        questions = read_questions(sys.stdin)
+    else:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = read_questions(f)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    answered = errors = 0
+    try:
+        # progress logging goes to stderr so stdout stays valid JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            for result in answer_batch(questions, search_workers=args.search_workers, llm_workers=args.llm_workers):
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                answered += 1
+                errors += "error" in result
+                print(f"[{answered}/{len(questions)}] {result['id']} in {result['timings']['total_ms']:.0f} ms")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"✅ {answered} questions ({errors} errors) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
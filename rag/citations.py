@@ -0,0 +1,88 @@
+# citation handling done in code instead of by the LLM.
+# the context passages are numbered [1]..[n], the model only writes those markers inline, and the
+# "References" section is rendered afterwards from the chunk metadata: readable titles, integer pages,
+# one line per document. that keeps the filename mapping and formatting rules out of the prompt.
+
+import os
+import re
+
+# readable titles for the processed pdfs
+PDF_NAME_MAP = {
+    "Becoming_a_Better_Mentor_ocr.pdf":"Becoming a Better Mentor: Strategies to be There for Young People",
+    "Confidential_Draft_SRDC_Report_ocr.pdf":"Unlocking Doors: Research on Mentoring to Strengthen Skills & Support Career Pathways for Racialized young Adults",
+    "Effective_Elements_For_Mentorship_ocr.pdf":"ELEMENTS OF EFFECTIVE PRACTICE FOR MENTORING: A Guide for Program Development and Improvement",
+    "Mapping_the_Gap_Report_ocr.pdf":"Mapping the Mentoring Gap Report: The State of Mentoring in Canada May 2021",
+    "MENTOR_The_Mentoring_Effect_Full_Report_ocr.pdf":"The Mentoring Effect: Young People's Perspectives on the Outcomes and Availability of Mentoring",
+    "Newcomer_Mentoring Effect_Brief_ocr.pdf":"The Mentoring Effect: Newcomer Youth",
+    "SRDC_Final_Report_ocr.pdf":"State of Mentoring Youth Survey Report: December 2020",
+    "SRDC_Final_RTP_Report_Dec15_FINAL_ocr.pdf":"Raising the Profile Report",
+    "Who-Mentored-You_ocr.pdf":"Who Mentored You 2023"
+}
+
+# [2], [1, 3], [1][3] ...
+_MARKER = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+
+
+def source_title(doc):
+    # ids look like rag/processed_pdfs/FILE.pdf:PAGE:INDEX
+    source = doc.metadata.get("source") or str(doc.metadata.get("id", "Unknown")).split(":")[0]
+    filename = os.path.basename(source)
+    return PDF_NAME_MAP.get(filename, filename)
+
+
+def page_number(doc):
+    try:
+        return int(float(doc.metadata.get("page", 0)))
+    except (TypeError, ValueError):
+        return None
+
+
+def format_context(results):
+    """
+    numbered passages for the prompt: "[1] text", "[2] text", ...
+    """
+    return "\n\n---\n\n".join(f"[{number}] {doc.page_content}" for number, (doc, _score) in enumerate(results, 1))
+
+
+def cited_numbers(answer, passages):
+    """
+    passage numbers the answer cites, in order of first appearance; out-of-range markers are ignored
+    """
+    cited = []
+    for match in _MARKER.finditer(answer):
+        for number in match.group(1).split(","):
+            number = int(number)
+            if 1 <= number <= passages and number not in cited:
+                cited.append(number)
+    return cited
+
+
+def render_references(answer, results, max_documents=5):
+    """
+    "References:" section built from the passages the answer cites (all passages if it cites none).
+    one line per document with its markers and pages merged, e.g. "- [1][4] Who Mentored You 2023, page 2, 14"
+    """
+    numbers = cited_numbers(answer, len(results)) or list(range(1, len(results) + 1))
+
+    by_title = {}
+    for number in numbers:
+        doc, _score = results[number - 1]
+        entry = by_title.setdefault(source_title(doc), {"markers": [], "pages": []})
+        entry["markers"].append(number)
+        page = page_number(doc)
+        if page is not None and page not in entry["pages"]:
+            entry["pages"].append(page)
+
+    if not by_title:
+        return ""
+    lines = []
+    for title, entry in list(by_title.items())[:max_documents]:
+        markers = "".join(f"[{number}]" for number in sorted(entry["markers"]))
+        pages = f", page {', '.join(str(p) for p in sorted(entry['pages']))}" if entry["pages"] else ""
+        lines.append(f"- {markers} {title}{pages}")
+    return "References:\n" + "\n".join(lines)
+
+
+def with_references(answer, results):
+    references = render_references(answer, results)
+    return f"{answer.rstrip()}\n\n{references}" if references else answer
@@ -0,0 +1,121 @@
+# builds the {context} block of the prompt from an over-fetched candidate list.
+# adjacent chunks share up to chunk_overlap (80) characters and near-identical chunks often rank together,
+# so instead of pasting the top-k verbatim we
+#   1. order candidates by maximal marginal relevance (relevance vs. similarity to what is already picked),
+#      computed on the vectors the vector store already returned, no extra embedding calls
+#   2. drop near-duplicates and trim the text a candidate shares with an already-picked chunk
+#   3. pack the survivors until the token budget is used up
+# every token we don't send is prompt-evaluation time Mistral doesn't spend.
+
+import re
+
+import numpy as np
+from langchain_core.documents import Document
+
+# a word, for shingling here and for the BM25 tokenizer in lexical_index
+WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text):
+    # mistral's tokenizer averages roughly 4 characters per token on English prose
+    return max(1, len(text) // 4) if text else 0
+
+
+def mmr_order(query_vector, vectors, lambda_mult=0.7):
+    """
+    returns candidate indices in maximal-marginal-relevance order
+    """
+    if len(vectors) == 0:
+        return []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    pairwise = matrix @ matrix.T
+
+    order = [int(np.argmax(relevance))]
+    # similarity of every candidate to the closest already-picked one
+    closest = pairwise[order[0]].copy()
+    remaining = set(range(len(matrix))) - set(order)
+    while remaining:
+        candidates = np.array(sorted(remaining))
+        scores = lambda_mult * relevance[candidates] - (1 - lambda_mult) * closest[candidates]
+        best = int(candidates[int(np.argmax(scores))])
+        order.append(best)
+        remaining.discard(best)
+        closest = np.maximum(closest, pairwise[best])
+    return order
+
+
+def _shingles(text, size=5):
+    words = WORD.findall(text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def containment(a, b):
+    """
+    share of the smaller text's 5-word shingles that also appear in the other
+    """
+    shingles_a, shingles_b = _shingles(a), _shingles(b)
+    if not shingles_a or not shingles_b:
+        return 0.0
+    return len(shingles_a & shingles_b) / min(len(shingles_a), len(shingles_b))
+
+
+def trim_overlap(text, kept, min_overlap=20, max_overlap=300):
+    """
+    removes a prefix of `text` that repeats the end of `kept`, or a suffix that repeats its start
+    (the splitter's chunk overlap)
+    """
+    limit = min(max_overlap, len(text), len(kept))
+    for size in range(limit, min_overlap - 1, -1):
+        if kept.endswith(text[:size]):
+            return text[size:].lstrip()
+    for size in range(limit, min_overlap - 1, -1):
+        if kept.startswith(text[-size:]):
+            return text[:-size].rstrip()
+    return text
+
+
+def build_context(query_vector, candidates, max_chunks=5, token_budget=1500, lambda_mult=0.7,
+                  duplicate_threshold=0.8):
+    """
+    candidates: list of (Document, score, vector) from the vector store, best first.
+    returns [(Document, score)] to put in the prompt; documents whose text was trimmed are copies.
+    without a query vector, or when some candidates have none (BM25 hits), the given order is kept
+    and only the de-duplication and the budget apply.
+    """
+    vectors = [vector for _, _, vector in candidates]
+    if query_vector is None or any(vector is None for vector in vectors):
+        order = list(range(len(candidates)))
+    else:
+        order = mmr_order(query_vector, vectors, lambda_mult)
+
+    selected = []
+    used_tokens = 0
+    for index in order:
+        doc, score, _ = candidates[index]
+        text = doc.page_content
+
+        if any(containment(text, kept.page_content) >= duplicate_threshold for kept, _ in selected):
+            continue
+        for kept, _ in selected:
+            text = trim_overlap(text, kept.page_content)
+        if not text.strip():
+            continue
+
+        tokens = estimate_tokens(text)
+        if used_tokens + tokens > token_budget:
+            # a shorter candidate further down may still fit
+            continue
+
+        if text != doc.page_content:
+            doc = Document(page_content=text, metadata=doc.metadata)
+        selected.append((doc, score))
+        used_tokens += tokens
+        if len(selected) == max_chunks:
+            break
+
+    return selected
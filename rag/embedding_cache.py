@@ -0,0 +1,180 @@
+# persistent embedding cache
+# ingestion and querying embed the same text over and over (unchanged chunks on every re-ingest,
+# repeated questions on /ask). this wraps any langchain Embeddings and only sends cache misses to the model.
+#
+# on-disk layout (one directory, shared by every process):
+#   <model>.f32    append-only float32 vectors, one fixed-size row per cached text, read through np.memmap
+#   index.sqlite   (model, text hash) -> row number in the matching .f32 file
+#   .lock          flock'ed by writers while appending so rows and index entries stay in step
+
+import fcntl
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# sqlite limits the number of host parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    # whitespace-only differences (re-OCR, trailing newlines) should not cost a new embedding
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    append-only memory-mapped vector file plus a SQLite index.
+    any number of processes can read while one appends: a row is fully written before its index entry is committed.
+    """
+
+    def __init__(self, cache_dir, model_name):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        os.makedirs(cache_dir, exist_ok=True)
+
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self.vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self.index_path = os.path.join(cache_dir, "index.sqlite")
+        self.lock_path = os.path.join(cache_dir, ".lock")
+
+        self._local = threading.local()
+        self._map_lock = threading.Lock()
+        self._mmap = None
+        self._dim = None
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, row INTEGER NOT NULL, dim INTEGER NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, hashes):
+        """
+        returns {hash: vector} for the hashes that are cached
+        """
+        rows = {}
+        conn = self._conn()
+        for start in range(0, len(hashes), _LOOKUP_BATCH):
+            batch = hashes[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for h, row, dim in conn.execute(
+                f"SELECT hash, row, dim FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [self.model_name, *batch],
+            ):
+                rows[h] = (row, dim)
+
+        if not rows:
+            return {}
+        dim = next(iter(rows.values()))[1]
+        matrix = self._vectors(dim, max(row for row, _ in rows.values()) + 1)
+        return {h: np.array(matrix[row]) for h, (row, _) in rows.items()}
+
+    def _vectors(self, dim, min_rows):
+        # remap only when the file has grown past what we have mapped
+        with self._map_lock:
+            if self._mmap is None or self._dim != dim or self._mmap.shape[0] < min_rows:
+                rows = os.path.getsize(self.vectors_path) // (dim * 4)
+                self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+                self._dim = dim
+            return self._mmap
+
+    def put_many(self, items):
+        """
+        appends {hash: vector} to the store. hashes another process added in the meantime are skipped.
+        """
+        if not items:
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                existing = self.get_many(list(items))
+                new_items = [(h, v) for h, v in items.items() if h not in existing]
+                if not new_items:
+                    return
+
+                matrix = np.asarray([v for _, v in new_items], dtype=np.float32)
+                dim = matrix.shape[1]
+                row_bytes = dim * 4
+                with open(self.vectors_path, "ab") as f:
+                    # drop a partial row left behind by a writer that crashed mid-append
+                    first_row = os.path.getsize(self.vectors_path) // row_bytes
+                    f.truncate(first_row * row_bytes)
+                    f.write(matrix.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                conn = self._conn()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (model, hash, row, dim) VALUES (?, ?, ?, ?)",
+                    [(self.model_name, h, first_row + i, dim) for i, (h, _) in enumerate(new_items)],
+                )
+                conn.commit()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    wraps an Embeddings model; vectors are looked up by (model name, normalized text hash)
+    and only the misses of a batch are sent to the wrapped model, in one call.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_dir="rag/embedding_cache"):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = EmbeddingStore(cache_dir, model_name)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [text_hash(text) for text in texts]
+        found = self.store.get_many(list(set(hashes)))
+
+        # embed each distinct missing text once
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self.store.put_many(new_items)
+            found.update({h: np.asarray(v, dtype=np.float32) for h, v in new_items.items()})
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return [found[h].tolist() for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        h = text_hash(text)
+        found = self.store.get_many([h])
+        if h in found:
+            self.hits += 1
+            return found[h].tolist()
+
+        vector = self.embeddings.embed_query(text)
+        self.store.put_many({h: vector})
+        self.misses += 1
+        return vector
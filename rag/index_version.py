@@ -0,0 +1,50 @@
+# the index version is a small marker file written by populate_database_pc.py after every ingest.
+# anything derived from the vector index (e.g. cached answers) is tied to it, so a re-ingest invalidates it.
+
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+INDEX_VERSION_PATH = os.getenv("RAG_INDEX_VERSION_PATH", "rag/index_version.txt")
+
+_cached = (None, None)  # (mtime, version)
+_lock = threading.Lock()
+
+
+def read_index_version(path=INDEX_VERSION_PATH):
+    """
+    returns the current index version, or "unversioned" if nothing has been ingested yet.
+    only re-reads the file when its mtime changes, so it is cheap to call per request.
+    """
+    global _cached
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return "unversioned"
+
+    cached_mtime, cached_version = _cached
+    if cached_mtime == mtime:
+        return cached_version
+
+    with open(path, encoding="utf-8") as f:
+        version = f.read().strip() or "unversioned"
+    with _lock:
+        _cached = (mtime, version)
+    return version
+
+
+def write_index_version(version=None, path=INDEX_VERSION_PATH):
+    """
+    records a new index version (a timestamped random id unless one is given)
+    """
+    if version is None:
+        version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+
+    # write then rename so readers never see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, path)
+    print(f"Index version is now {version}")
+    return version
@@ -0,0 +1,67 @@
+# ingestion manifest: per-file and per-chunk content hashes from the last successful ingest.
+# populate_database_pc.py --incremental uses it to only re-process PDFs whose bytes changed,
+# upsert only chunks whose text changed and delete chunk ids that no longer exist.
+
+import hashlib
+import json
+import os
+
+MANIFEST_PATH = "rag/ingest_manifest.json"
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(chunk):
+    return hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    returns {"files": {pdf path: {"sha256": ..., "chunks": {chunk id: chunk hash}}}}
+    """
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    # only written after the vector store accepted every change, so a failed run is simply retried
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def manifest_version(manifest):
+    """
+    content-derived index version: identical chunks give an identical version,
+    so a no-op ingest does not invalidate downstream caches
+    """
+    digest = hashlib.sha256()
+    for path in sorted(manifest["files"]):
+        for chunk_id, h in sorted(manifest["files"][path]["chunks"].items()):
+            digest.update(f"{chunk_id}\0{h}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def plan_changes(manifest, paths):
+    """
+    compares the pdfs on disk with the manifest.
+    returns (changed paths with their new file hash, removed paths)
+    """
+    known = manifest["files"]
+    changed = {}
+    for path in paths:
+        h = file_hash(path)
+        if known.get(path, {}).get("sha256") != h:
+            changed[path] = h
+    current = set(paths)
+    removed = [path for path in known if path not in current]
+    return changed, removed
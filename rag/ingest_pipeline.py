@@ -0,0 +1,137 @@
+# streaming embed -> upsert pipeline for ingestion
+# chunks are embedded in fixed-size batches by a small worker pool; finished batches go through a bounded
+# queue to upsert workers. at most a fixed number of batches are in memory at once, whatever the corpus size,
+# and a batch that keeps failing is reported instead of aborting the whole run.
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+
+from rag.ollama_client import OllamaSettings, with_retries
+
+
+@dataclass
+class PipelineStats:
+    chunks: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    retries: int = 0
+    failed_ids: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self):
+        rate = lambda n: n / self.elapsed if self.elapsed else 0.0
+        return (f"{self.upserted}/{self.chunks} chunks upserted in {self.elapsed:.1f}s "
+                f"({rate(self.embedded):.1f} chunks/s embedded, {rate(self.upserted):.1f} vectors/s upserted, "
+                f"{self.retries} retries, {len(self.failed_ids)} failed)")
+
+
+def _batches(chunks, batch_size):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _retryable(error):
+    # an upsert target (Pinecone, the local index) has no notion of a transient error, so retry anything;
+    # with_retries never retries a TimeoutError: the next attempt would most likely wait just as long
+    return True
+
+
+def run_ingest_pipeline(chunks, embed_fn, upsert_fn, batch_size=64, embed_workers=4, upsert_workers=2,
+                        queue_size=4, retries=3, backoff=1.0, progress_every=10.0, embed_retries=None):
+    """
+    chunks:    iterable of Documents that already carry metadata["id"] (may be a generator)
+    embed_fn:  list[str] -> list of vectors
+    upsert_fn: (list[Document], vectors) -> None
+    embed_retries: retries of a failed embedding batch (default: `retries`); 0 when embed_fn retries itself
+    retries are jittered like Ollama's (capped by OLLAMA_RETRY_MAX_BACKOFF), starting from `backoff` seconds
+    returns PipelineStats; ids of batches that failed after all retries are in stats.failed_ids
+    """
+    if embed_retries is None:
+        embed_retries = retries
+    settings = OllamaSettings.from_env()
+    upsert_policy = replace(settings, retries=retries, retry_backoff=backoff)
+    embed_policy = replace(settings, retries=embed_retries, retry_backoff=backoff)
+    stats = PipelineStats()
+    lock = threading.Lock()
+    embedded = queue.Queue(maxsize=queue_size)
+    # a slot is held from the moment a batch is formed until it is upserted (or given up on),
+    # which is what keeps memory flat: the producer waits when every slot is taken
+    slots = threading.BoundedSemaphore(embed_workers + queue_size + upsert_workers)
+    start = time.perf_counter()
+    last_report = [start]
+
+    def count_retry():
+        with lock:
+            stats.retries += 1
+
+    def fail(batch, stage, error):
+        print(f"❌ Giving up on a batch of {len(batch)} chunks during {stage}: {error}")
+        with lock:
+            stats.failed_ids.extend(chunk.metadata["id"] for chunk in batch)
+
+    def report():
+        now = time.perf_counter()
+        with lock:
+            if now - last_report[0] < progress_every:
+                return
+            last_report[0] = now
+            stats.elapsed = now - start
+            print(f"... {stats.summary()}")
+
+    def embed(batch):
+        try:
+            vectors = with_retries(lambda: embed_fn([chunk.page_content for chunk in batch]), embed_policy, "embed",
+                                   retry_if=_retryable, on_retry=count_retry)
+        except Exception as e:
+            fail(batch, "embedding", e)
+            slots.release()
+            return
+        with lock:
+            stats.embedded += len(batch)
+        embedded.put((batch, vectors))
+
+    def upsert_worker():
+        while True:
+            item = embedded.get()
+            if item is None:
+                return
+            batch, vectors = item
+            try:
+                with_retries(lambda: upsert_fn(batch, vectors), upsert_policy, "upsert",
+                             retry_if=_retryable, on_retry=count_retry)
+                with lock:
+                    stats.upserted += len(batch)
+            except Exception as e:
+                fail(batch, "upsert", e)
+            finally:
+                slots.release()
+            report()
+
+    upserters = [threading.Thread(target=upsert_worker, daemon=True) for _ in range(upsert_workers)]
+    for thread in upserters:
+        thread.start()
+
+    with ThreadPoolExecutor(max_workers=embed_workers) as pool:
+        for batch in _batches(chunks, batch_size):
+            slots.acquire()
+            with lock:
+                stats.chunks += len(batch)
+            pool.submit(embed, batch)
+
+    for _ in upserters:
+        embedded.put(None)
+    for thread in upserters:
+        thread.join()
+
+    stats.elapsed = time.perf_counter() - start
+    print(stats.summary())
+    return stats
@@ -0,0 +1,198 @@
+# local BM25 index over the ingested chunks, built by populate_database_pc.py next to the vector index.
+# used by query_rag for hybrid retrieval (BM25 + dense results fused with reciprocal rank fusion) and as an
+# embedding-free fast path when Ollama is slow or down. exact terms like "SRDC" or program names score well
+# here even when the embedding puts them close to a lot of unrelated text.
+#
+# on-disk layout (one directory), everything but the term list is a flat numpy array loaded with mmap:
+#   terms.json      sorted vocabulary; term i's postings are postings[offsets[i]:offsets[i + 1]]
+#   offsets.npy     int64 (terms + 1)
+#   postings.npy    int32 chunk rows, grouped by term
+#   tf.npy          uint16 term frequency of each posting
+#   idf.npy         float32 per-term BM25 idf
+#   norms.npy       float32 per-chunk k1 * (1 - b + b * length / avg length), precomputed at build time
+#   metadata.jsonl  one {"id", "text", "metadata"} line per chunk row, read on demand (only for hits)
+#   rows.npy        int64 (count + 1) byte offsets of the metadata.jsonl lines
+#   manifest.json   {"count", "terms", "postings", "avgdl", "k1", "b", "digest"}
+#                   digest: hash of the indexed ids and texts, part of the index version populate_database_pc writes
+
+import hashlib
+import json
+import math
+import mmap
+import os
+from collections import Counter
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.context_builder import WORD
+from rag.local_index import replace_dir
+
+LEXICAL_INDEX_PATH = "rag/lexical_index"
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how in is it its of on or that the their there "
+    "these they this to was were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def exists(path=LEXICAL_INDEX_PATH):
+    return os.path.exists(os.path.join(path, "manifest.json"))
+
+
+def index_digest(path=LEXICAL_INDEX_PATH):
+    """
+    content hash of the index at `path` ("" for a missing index or one built before digests were recorded)
+    """
+    if not exists(path):
+        return ""
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f).get("digest", "")
+
+
+class LexicalIndex:
+
+    def __init__(self, path=LEXICAL_INDEX_PATH):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.k1 = manifest["k1"]
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            self._term_row = {term: row for row, term in enumerate(json.load(f))}
+
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.offsets, self.postings, self.tf = load("offsets.npy"), load("postings.npy"), load("tf.npy")
+        self.idf, self.norms = load("idf.npy"), load("norms.npy")
+
+        self.count = manifest["count"]
+        self._row_offsets = load("rows.npy")
+        self._rows = None
+        if self.count:
+            with open(os.path.join(path, "metadata.jsonl"), "rb") as f:
+                self._rows = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def row(self, number):
+        """
+        {"id", "text", "metadata"} of one chunk row
+        """
+        return json.loads(self._rows[self._row_offsets[number]:self._row_offsets[number + 1]])
+
+    def rows(self):
+        return (self.row(number) for number in range(self.count))
+
+    @classmethod
+    def build(cls, ids, texts, metadatas, path=LEXICAL_INDEX_PATH, k1=1.2, b=0.75):
+        """
+        writes a new index for the given chunks (replacing the one at `path` atomically) and loads it
+        """
+        counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        avgdl = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        by_term = {}
+        for row, counter in enumerate(counts):
+            for term, tf in counter.items():
+                by_term.setdefault(term, []).append((row, tf))
+        terms = sorted(by_term)
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings, frequencies, idf = [], [], np.zeros(len(terms), dtype=np.float32)
+        for number, term in enumerate(terms):
+            entries = by_term[term]
+            offsets[number + 1] = offsets[number] + len(entries)
+            postings.extend(row for row, _ in entries)
+            frequencies.extend(min(tf, 65535) for _, tf in entries)
+            df = len(entries)
+            idf[number] = math.log(1 + (len(texts) - df + 0.5) / (df + 0.5))
+        norms = (k1 * (1 - b + b * lengths / avgdl)).astype(np.float32)
+
+        with replace_dir(path, prefix=".lexical_index_") as tmp_dir:
+            with open(os.path.join(tmp_dir, "terms.json"), "w", encoding="utf-8") as f:
+                json.dump(terms, f)
+            np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+            np.save(os.path.join(tmp_dir, "postings.npy"), np.asarray(postings, dtype=np.int32))
+            np.save(os.path.join(tmp_dir, "tf.npy"), np.asarray(frequencies, dtype=np.uint16))
+            np.save(os.path.join(tmp_dir, "idf.npy"), idf)
+            np.save(os.path.join(tmp_dir, "norms.npy"), norms)
+            row_offsets = [0]
+            digest = hashlib.sha256()
+            with open(os.path.join(tmp_dir, "metadata.jsonl"), "wb") as f:
+                for doc_id, text, metadata in zip(ids, texts, metadatas):
+                    line = (json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n").encode("utf-8")
+                    f.write(line)
+                    row_offsets.append(row_offsets[-1] + len(line))
+                    digest.update(f"{doc_id}\0{text}\n".encode("utf-8"))
+            np.save(os.path.join(tmp_dir, "rows.npy"), np.asarray(row_offsets, dtype=np.int64))
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({"count": len(ids), "terms": len(terms), "postings": len(postings),
+                           "avgdl": avgdl, "k1": k1, "b": b, "digest": digest.hexdigest()[:16]}, f)
+        return cls(path)
+
+    def search(self, query_text, k=5):
+        """
+        returns [(Document, bm25 score)] for the k best chunks, best first; chunks sharing no term are left out
+        """
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize(query_text)):
+            row = self._term_row.get(term)
+            if row is None:
+                continue
+            start, end = self.offsets[row], self.offsets[row + 1]
+            docs = self.postings[start:end]
+            tf = self.tf[start:end].astype(np.float32)
+            # a term appears once per chunk in its postings, so plain fancy-index addition is safe
+            scores[docs] += self.idf[row] * tf * (self.k1 + 1) / (tf + self.norms[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        rows = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        rows = rows[np.argsort(-scores[rows])]
+        hits = []
+        for number in rows:
+            row = self.row(number)
+            hits.append((Document(page_content=row["text"], metadata=row["metadata"]), float(scores[number])))
+        return hits
+
+
+def update_lexical_index(chunks, deleted_ids=(), path=LEXICAL_INDEX_PATH):
+    """
+    adds / replaces the given chunks (by metadata["id"]), drops deleted_ids and rebuilds the index.
+    a full rebuild takes well under a second for our corpus, so there is no in-place update
+    """
+    rows = {}
+    if exists(path):
+        rows = {row["id"]: (row["text"], row["metadata"]) for row in LexicalIndex(path).rows()}
+    for doc_id in deleted_ids:
+        rows.pop(doc_id, None)
+    for chunk in chunks:
+        rows[chunk.metadata["id"]] = (chunk.page_content, chunk.metadata)
+
+    ids = sorted(rows)
+    index = LexicalIndex.build(ids, [rows[i][0] for i in ids], [rows[i][1] for i in ids], path=path)
+    print(f"Lexical index: {index.count} chunks, {len(index._term_row)} terms at {path}")
+    return index
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    rankings: lists of (Document, score, vector) (or (Document, score)), each best first.
+    returns one list of (Document, fused score, vector or None) ordered by sum(1 / (k + rank)) over the
+    lists a chunk appears in. the vector is kept from whichever list had one (the dense results).
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, 1):
+            doc = hit[0]
+            vector = hit[2] if len(hit) > 2 else None
+            key = doc.metadata.get("id") or doc.page_content
+            entry = fused.setdefault(key, [doc, 0.0, None])
+            entry[1] += 1.0 / (k + rank)
+            if entry[2] is None and vector is not None:
+                entry[2] = vector
+    return sorted((tuple(entry) for entry in fused.values()), key=lambda entry: -entry[1])
@@ -0,0 +1,273 @@
+# local, in-process vector index: a drop-in alternative to PineconeVectorStore for our small corpus.
+# retrieval is a single matrix-vector product over a memory-mapped float32 (or int8) matrix, no network round trip.
+#
+# on-disk layout (one directory):
+#   vectors.npy     float32 (count, dim) unit-normalized rows, or int8 rows when quantized
+#   scales.npy      per-row float32 scale for int8 rows (row ≈ int8 * scale)
+#   metadata.jsonl  one {"id", "text", "metadata"} line per row, same order as the matrix
+#   manifest.json   {"count", "dim", "dtype"}
+#
+# int8 makes the file and its page-cache footprint 4x smaller. queries convert it to float32 block by block, so
+# they run at about float32 speed on large indexes and somewhat slower on small ones that fit in cache anyway.
+
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+LOCAL_INDEX_PATH = "rag/local_index"
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+@contextlib.contextmanager
+def replace_dir(path, prefix):
+    """
+    yields a temp dir next to `path` to write an index into, then swaps it in for `path`,
+    so readers never see a half-written index. the temp dir is removed if writing fails
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=prefix, dir=parent)
+    try:
+        yield tmp_dir
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = None
+    if os.path.exists(path):
+        old_dir = tempfile.mkdtemp(prefix=prefix + "old_", dir=parent)
+        os.replace(path, os.path.join(old_dir, "index"))
+    os.replace(tmp_dir, path)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# rows of an int8 matrix converted to float32 at a time when scoring (256 x 1024 dims = 1 MB)
+_INT8_BLOCK_ROWS = 256
+
+
+def quantize_int8(matrix):
+    """
+    symmetric per-row int8 quantization of unit-normalized rows
+    """
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    exact cosine top-k over a memory-mapped matrix. scores are cosine similarities like the pinecone index.
+    writes rewrite the whole directory atomically, which is fine at our corpus size (a few thousand chunks).
+    """
+
+    def __init__(self, path=LOCAL_INDEX_PATH, embedding: Embeddings | None = None, quantize=None):
+        self.path = path
+        self.embedding = embedding
+        self.quantize = quantize
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    # ---------------------------------------------------
+    # loading / saving
+    # ---------------------------------------------------
+    def _load(self):
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest_path):
+            self.ids, self.texts, self.metadatas = [], [], []
+            self.matrix, self.scales = None, None
+            self._row_of = {}
+            return
+
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if self.quantize is None and manifest["dtype"] == "int8":
+            self.quantize = "int8"
+
+        self.ids, self.texts, self.metadatas = [], [], []
+        with open(os.path.join(self.path, "metadata.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.texts.append(row["text"])
+                self.metadatas.append(row["metadata"])
+
+        # mmap: the OS pages the matrix in on first use and shares it between worker processes
+        self.matrix = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        self.scales = None
+        if manifest["dtype"] == "int8":
+            self.scales = np.load(os.path.join(self.path, "scales.npy"))
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def _save(self, ids, texts, metadatas, vectors):
+        vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32)) if len(ids) else np.zeros((0, 0), np.float32)
+
+        with replace_dir(self.path, prefix=".local_index_") as tmp_dir:
+            if self.quantize == "int8":
+                quantized, scales = quantize_int8(vectors)
+                np.save(os.path.join(tmp_dir, "vectors.npy"), quantized)
+                np.save(os.path.join(tmp_dir, "scales.npy"), scales)
+            else:
+                np.save(os.path.join(tmp_dir, "vectors.npy"), vectors)
+
+            with open(os.path.join(tmp_dir, "metadata.jsonl"), "w", encoding="utf-8") as f:
+                for doc_id, text, metadata in zip(ids, texts, metadatas):
+                    f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "count": len(ids),
+                    "dim": int(vectors.shape[1]) if len(ids) else 0,
+                    "dtype": "int8" if self.quantize == "int8" else "float32",
+                }, f)
+        self._load()
+
+    def _float_vectors(self):
+        if self.matrix is None:
+            return np.zeros((0, 0), np.float32)
+        if self.scales is not None:
+            return self.matrix.astype(np.float32) * self.scales[:, None]
+        return np.asarray(self.matrix, dtype=np.float32)
+
+    # ---------------------------------------------------
+    # writes
+    # ---------------------------------------------------
+    def upsert_vectors(self, ids, vectors, texts, metadatas):
+        """
+        inserts or replaces rows by id with already-computed vectors
+        """
+        all_ids, all_texts, all_metadatas = list(self.ids), list(self.texts), list(self.metadatas)
+        existing = self._float_vectors()
+        all_vectors = list(existing) if len(all_ids) else []
+        row_of = dict(self._row_of)
+
+        for doc_id, vector, text, metadata in zip(ids, vectors, texts, metadatas):
+            vector = np.asarray(vector, dtype=np.float32)
+            if doc_id in row_of:
+                row = row_of[doc_id]
+                all_vectors[row], all_texts[row], all_metadatas[row] = vector, text, metadata
+            else:
+                row_of[doc_id] = len(all_ids)
+                all_ids.append(doc_id)
+                all_vectors.append(vector)
+                all_texts.append(text)
+                all_metadatas.append(metadata)
+
+        self._save(all_ids, all_texts, all_metadatas, np.stack(all_vectors) if all_vectors else [])
+        return list(ids)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        if ids is None:
+            ids = [metadata.get("id") or str(i + len(self.ids)) for i, metadata in enumerate(metadatas)]
+        vectors = self.embedding.embed_documents(texts)
+        return self.upsert_vectors(list(ids), vectors, texts, metadatas)
+
+    def add_documents(self, documents, ids=None, **kwargs):
+        return self.add_texts(
+            [doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+        )
+
+    def delete(self, ids=None, **kwargs):
+        if not ids or not self.ids:
+            return True
+        drop = set(ids)
+        keep = [row for row, doc_id in enumerate(self.ids) if doc_id not in drop]
+        vectors = self._float_vectors()[keep] if keep else []
+        self._save(
+            [self.ids[row] for row in keep],
+            [self.texts[row] for row in keep],
+            [self.metadatas[row] for row in keep],
+            vectors,
+        )
+        return True
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, path=LOCAL_INDEX_PATH, quantize=None, **kwargs):
+        store = cls(path=path, embedding=embedding, quantize=quantize)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    # ---------------------------------------------------
+    # search
+    # ---------------------------------------------------
+    def top_k(self, query_vector, k=5):
+        """
+        returns (rows, scores) of the k most similar rows, best first
+        """
+        if self.matrix is None or not len(self.ids):
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if self.scales is None:
+            scores = self.matrix @ query
+        else:
+            # `int8 @ float32` makes numpy upcast the whole matrix on every query (slower than float32 and
+            # no memory saved); converting cache-sized blocks keeps float32 speed with a small, fixed buffer
+            scores = np.empty(len(self.matrix), dtype=np.float32)
+            for start in range(0, len(self.matrix), _INT8_BLOCK_ROWS):
+                block = self.matrix[start:start + _INT8_BLOCK_ROWS]
+                np.dot(block.astype(np.float32), query, out=scores[start:start + len(block)])
+            scores *= self.scales
+
+        k = min(k, len(scores))
+        # argpartition is O(n); only the k winners get sorted
+        rows = np.argpartition(-scores, k - 1)[:k]
+        rows = rows[np.argsort(-scores[rows])]
+        return rows, scores[rows]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+        rows, scores = self.top_k(embedding, k)
+        return [
+            (Document(page_content=self.texts[row], metadata=dict(self.metadatas[row])), float(score))
+            for row, score in zip(rows, scores)
+        ]
+
+    def similarity_search_by_vector_with_vectors(self, embedding, k=4):
+        """
+        like similarity_search_by_vector_with_score, plus each hit's stored (unit) vector
+        """
+        rows, scores = self.top_k(embedding, k)
+        if not len(rows):
+            return []
+        vectors = self.matrix[rows].astype(np.float32)
+        if self.scales is not None:
+            vectors = vectors * self.scales[rows][:, None]
+        return [
+            (Document(page_content=self.texts[row], metadata=dict(self.metadatas[row])), float(score), vector)
+            for row, score, vector in zip(rows, scores, vectors)
+        ]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k=k)
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k)]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
@@ -0,0 +1,175 @@
+# in-process metrics for the RAG path: timing spans, counters and gauges, rendered in the
+# Prometheus text format for /metrics (and as a plain summary for the ingestion CLI).
+# latency percentiles are computed over a sliding window of recent observations per series.
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 2048
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in items) + "}"
+
+
+class _Summary:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent:
+            return math.nan
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}  # name -> {label key: _Summary}
+        self._counters = {}   # name -> {label key: float}
+        self._help = {}
+        self._gauge_callbacks = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            summary = series.get(_label_key(labels))
+            if summary is None:
+                summary = series[_label_key(labels)] = _Summary()
+            summary.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def register_gauges(self, callback):
+        """
+        callback() -> iterable of (name, labels dict, value); called at scrape time
+        """
+        self._gauge_callbacks.append(callback)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        times the with-block into rag_stage_seconds{stage=...}
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("rag_stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def quantile(self, name, q, **labels):
+        with self._lock:
+            summary = self._summaries.get(name, {}).get(_label_key(labels))
+            return summary.quantile(q) if summary else math.nan
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, summary in sorted(series.items()):
+                    for q in QUANTILES:
+                        lines.append(f"{name}{_format_labels(key, {'quantile': q})} {summary.quantile(q)}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {summary.total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {summary.count}")
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+        gauges = {}
+        for callback in self._gauge_callbacks:
+            try:
+                for name, labels, value in callback():
+                    gauges.setdefault(name, []).append((labels, value))
+            except Exception as e:
+                print(f"❌ Metrics gauge callback failed: {e}")
+        for name, series in sorted(gauges.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in series:
+                lines.append(f"{name}{_format_labels(sorted(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        {name: {"stage=embed": {"count", "sum", "p50", "p95", "p99"}}}, for JSON benchmark reports
+        """
+        result = {}
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                for key, summary in sorted(series.items()):
+                    label = ",".join(f"{k}={v}" for k, v in key)
+                    result.setdefault(name, {})[label] = {
+                        "count": summary.count,
+                        "sum": summary.total,
+                        **{f"p{round(q * 100)}": summary.quantile(q) for q in QUANTILES},
+                    }
+            for name, series in sorted(self._counters.items()):
+                for key, value in sorted(series.items()):
+                    result.setdefault(name, {})[",".join(f"{k}={v}" for k, v in key)] = value
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+
+    def summary(self):
+        """
+        human-readable per-stage latency table (used by the ingestion CLI)
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._summaries.items()):
+                for key, summary in sorted(series.items()):
+                    label = ",".join(f"{k}={v}" for k, v in key)
+                    p50, p95, p99 = (summary.quantile(q) for q in QUANTILES)
+                    lines.append(f"{name}[{label}] n={summary.count} total={summary.total:.2f} "
+                                 f"p50={p50:.3f} p95={p95:.3f} p99={p99:.3f}")
+        return "\n".join(lines)
+
+
+# process-wide registry
+METRICS = MetricsRegistry()
+METRICS.describe("rag_stage_seconds", "Latency of each RAG / ingestion stage in seconds.")
+METRICS.describe("rag_requests_total", "RAG requests by endpoint mode and outcome.")
+METRICS.describe("rag_prompt_tokens", "Estimated prompt tokens per generation.")
+METRICS.describe("rag_completion_tokens", "Generated tokens per answer (stream chunks, or estimated).")
+METRICS.describe("rag_generation_tokens_per_second", "Generated tokens per second of LLM time.")
+METRICS.describe("rag_lexical_fallback_total", "Queries answered from the BM25 index because the embedding was slow or failed.")
+METRICS.describe("rag_ollama_retries_total", "Ollama calls (and ingest upserts) retried after a transient failure, by call.")
+METRICS.describe("rag_ollama_errors_total", "Ollama calls (and ingest upserts) that failed for good (timeout or error), by call.")
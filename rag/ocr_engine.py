@@ -0,0 +1,155 @@
+# parallel, memory-bounded OCR engine
+# pages are rasterized a small window at a time inside worker processes and OCR'd there, so peak memory is
+# roughly workers x window x one page image instead of the whole document. tesseract returns a one-page
+# searchable pdf per image and those bytes are merged in memory, no png or temp pdf files on disk.
+# pages that already have a good text layer skip OCR entirely (see rag/page_classifier.py).
+
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pypdf import PdfReader, PdfWriter
+
+from rag.page_classifier import classify_pages
+
+
+@dataclass
+class OcrStats:
+    pdf: str
+    pages: int
+    seconds: float
+    pages_ocr: int = 0
+    pages_skipped: int = 0
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def seconds_saved(self):
+        # estimate: skipped pages would have cost as much as the pages we did OCR
+        return self.pages_skipped * self.seconds / self.pages_ocr if self.pages_ocr else 0.0
+
+    def summary(self):
+        return (f"{self.pdf}: {self.pages} pages in {self.seconds:.1f}s ({self.pages_per_sec:.2f} pages/s), "
+                f"{self.pages_ocr} OCR'd, {self.pages_skipped} kept their text layer (~{self.seconds_saved:.0f}s saved)")
+
+
+def _init_worker():
+    # one process per core already; stop tesseract from also spawning a thread per core in each of them
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def make_executor(workers=None):
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker)
+
+
+def page_count(pdf_path):
+    return int(pdfinfo_from_path(str(pdf_path))["Pages"])
+
+
+def ocr_page_window(pdf_path, first_page, last_page, dpi=200, lang="eng"):
+    """
+    rasterizes pages first_page..last_page (1-based, inclusive) and returns one searchable pdf (bytes) per page
+    """
+    images = convert_from_path(str(pdf_path), dpi=dpi, first_page=first_page, last_page=last_page)
+    pages = []
+    for image in images:
+        pages.append(pytesseract.image_to_pdf_or_hocr(image, extension="pdf", lang=lang))
+        image.close()
+    return pages
+
+
+def page_windows(page_numbers, window):
+    """
+    groups 1-based page numbers into (first, last) ranges of consecutive pages, at most `window` long
+    """
+    windows = []
+    for page in sorted(page_numbers):
+        if windows and page == windows[-1][1] + 1 and page - windows[-1][0] < window:
+            windows[-1] = (windows[-1][0], page)
+        else:
+            windows.append((page, page))
+    return windows
+
+
+def ocr_pages(pdf_path, page_numbers, executor, window=4, dpi=200, lang="eng"):
+    """
+    OCRs the given 1-based pages on the executor, yielding (page number, pdf bytes) as each window finishes
+    """
+    futures = {
+        executor.submit(ocr_page_window, str(pdf_path), first, last, dpi, lang): first
+        for first, last in page_windows(page_numbers, window)
+    }
+    for future in as_completed(futures):
+        first = futures[future]
+        for offset, page_pdf in enumerate(future.result()):
+            yield first + offset, page_pdf
+
+
+def merge_pages(pages):
+    """
+    merges pages (in order) into one pdf, returned as bytes.
+    each page is either single-page pdf bytes from tesseract or a pypdf page copied from the source.
+    """
+    writer = PdfWriter()
+    for page in pages:
+        if isinstance(page, bytes):
+            page = PdfReader(io.BytesIO(page)).pages[0]
+        writer.add_page(page)
+    output = io.BytesIO()
+    writer.write(output)
+    writer.close()
+    return output.getvalue()
+
+
+def ocr_pdf(pdf_path, output_path, workers=None, window=4, dpi=200, lang="eng", executor=None, selective=True):
+    """
+    OCRs the pages of pdf_path across a process pool and writes a text-selectable pdf to output_path.
+    with selective=True, pages that already have a usable text layer are copied through without OCR.
+    pass an existing executor to reuse one pool across many documents.
+    """
+    start = time.perf_counter()
+    if selective:
+        to_ocr = [page + 1 for page, needed in enumerate(classify_pages(pdf_path)) if needed]
+        pages = PdfReader(str(pdf_path)).pages
+        page_total = len(pages)
+    else:
+        page_total = page_count(pdf_path)
+        to_ocr = list(range(1, page_total + 1))
+        pages = None
+
+    ocr_results = {}
+    if to_ocr:
+        own_executor = executor is None
+        if own_executor:
+            executor = make_executor(workers)
+        try:
+            for number, page_pdf in ocr_pages(pdf_path, to_ocr, executor, window, dpi, lang):
+                ocr_results[number] = page_pdf
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    merged = merge_pages([
+        ocr_results[number] if number in ocr_results else pages[number - 1]
+        for number in range(1, page_total + 1)
+    ])
+    tmp_path = f"{output_path}.part"
+    with open(tmp_path, "wb") as f:
+        f.write(merged)
+    os.replace(tmp_path, output_path)
+
+    stats = OcrStats(
+        pdf=os.path.basename(str(pdf_path)),
+        pages=page_total,
+        seconds=time.perf_counter() - start,
+        pages_ocr=len(to_ocr),
+        pages_skipped=page_total - len(to_ocr),
+    )
+    print(f"✅ {stats.summary()}")
+    return stats
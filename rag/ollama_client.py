@@ -0,0 +1,222 @@
+# Ollama client policy shared by ingestion (populate_database_pc.py) and querying (the RAG runtime).
+# the ollama python client has no timeout by default, so a stuck model used to hold a flask worker forever.
+# every model object built here gets:
+#   - one pooled keep-alive http client (OLLAMA_MAX_CONNECTIONS)
+#   - a connect timeout and a read timeout, i.e. the longest Ollama may stay silent: the whole response for
+#     an embedding, the time to the first token / between tokens for a generation
+#   - bounded retries with jittered exponential backoff, only for failures worth retrying (connection
+#     refused / reset, 5xx while a model loads, 429). timeouts are not retried: the caller fails fast
+#   - keep_alive for the model, plus num_ctx / num_predict for generations
+
+import os
+import random
+import time
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+from rag.metrics import METRICS
+
+# get variables from .env file
+load_dotenv()
+
+
+def _keep_alive(value):
+    # ollama takes a number of seconds or a Go duration string ("5m", "1h30m"), passed through as is
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+@dataclass(frozen=True)
+class OllamaSettings:
+    """
+    Ollama connection / retry / generation settings, read from environment variables (.env)
+    """
+    base_url: str | None
+    max_connections: int
+    keep_alive: int | str
+    connect_timeout: float
+    embed_timeout: float
+    generate_timeout: float
+    retries: int
+    retry_backoff: float
+    retry_max_backoff: float
+    num_ctx: int | None
+    num_predict: int | None
+
+    @classmethod
+    def from_env(cls):
+        num_ctx = os.getenv("RAG_LLM_NUM_CTX")
+        num_predict = os.getenv("RAG_LLM_NUM_PREDICT")
+        return cls(
+            base_url=os.getenv("OLLAMA_BASE_URL") or None,
+            max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8")),
+            # how long Ollama keeps the models loaded after a request: seconds or a duration like "10m";
+            # -1 pins them until Ollama restarts
+            keep_alive=_keep_alive(os.getenv("RAG_OLLAMA_KEEP_ALIVE", "-1")),
+            connect_timeout=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")),
+            # an ingest batch of 64 chunks on a cold model can take a while
+            embed_timeout=float(os.getenv("OLLAMA_EMBED_TIMEOUT", "60")),
+            generate_timeout=float(os.getenv("OLLAMA_GENERATE_TIMEOUT", "60")),
+            # attempts after the first one, waiting random(0, min(max, backoff * 2^attempt)) seconds in between
+            retries=int(os.getenv("OLLAMA_RETRIES", "2")),
+            retry_backoff=float(os.getenv("OLLAMA_RETRY_BACKOFF", "0.5")),
+            retry_max_backoff=float(os.getenv("OLLAMA_RETRY_MAX_BACKOFF", "5")),
+            # unset = the model's defaults (num_ctx 2048 for mistral in Ollama, no token cap)
+            num_ctx=int(num_ctx) if num_ctx else None,
+            num_predict=int(num_predict) if num_predict else None,
+        )
+
+
+def client_kwargs(settings: OllamaSettings, read_timeout):
+    # httpx is installed with the ollama client; one pooled keep-alive client per model object
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_connections,
+    )
+    timeout = httpx.Timeout(read_timeout, connect=settings.connect_timeout, pool=settings.connect_timeout)
+    return {"limits": limits, "timeout": timeout}
+
+
+def is_transient(error):
+    """
+    True for failures a retry can fix: Ollama unreachable or restarting, busy (503 / 429), model still loading
+    """
+    import httpx
+    from ollama import ResponseError
+
+    if isinstance(error, ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, httpx.TimeoutException):
+        # a pool / connect timeout means the request never reached Ollama; a read timeout means it is stuck
+        return isinstance(error, (httpx.ConnectTimeout, httpx.PoolTimeout))
+    # the ollama client turns httpx.ConnectError into ConnectionError
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+def _backoff(settings: OllamaSettings, attempt):
+    # "full jitter": workers that failed together don't all come back at the same moment
+    return random.uniform(0, min(settings.retry_max_backoff, settings.retry_backoff * 2 ** attempt))
+
+
+def _timed_out(error, call, timeout):
+    import httpx
+
+    if isinstance(error, httpx.ReadTimeout) and timeout is not None:
+        METRICS.inc("rag_ollama_errors_total", call=call, reason="timeout")
+        return TimeoutError(f"Ollama {call} timed out (no response for {timeout:g}s)")
+    return None
+
+
+def with_retries(fn, settings: OllamaSettings, call, timeout=None, retry_if=is_transient, on_retry=None):
+    """
+    fn() with up to settings.retries retries for failures retry_if() accepts (transient Ollama errors by default).
+    a read timeout is raised as TimeoutError (never retried), anything else as is.
+    the ingest pipeline uses it for its upserts too, with its own retry_if
+    """
+    for attempt in range(settings.retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            timeout_error = _timed_out(e, call, timeout)
+            if timeout_error is not None:
+                raise timeout_error from e
+            if attempt == settings.retries or isinstance(e, TimeoutError) or not retry_if(e):
+                METRICS.inc("rag_ollama_errors_total", call=call, reason="error")
+                raise
+            delay = _backoff(settings, attempt)
+            print(f"🔄 {call} failed ({e!r}), retry {attempt + 1}/{settings.retries} in {delay:.1f}s")
+            METRICS.inc("rag_ollama_retries_total", call=call)
+            if on_retry:
+                on_retry()
+            time.sleep(delay)
+
+
+class RetryingEmbeddings(Embeddings):
+    """
+    any langchain Embeddings behind the retry / timeout policy
+    """
+
+    def __init__(self, embeddings: Embeddings, settings: OllamaSettings):
+        self.embeddings = embeddings
+        self.settings = settings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return with_retries(lambda: self.embeddings.embed_documents(texts), self.settings, "embed",
+                            self.settings.embed_timeout)
+
+    def embed_query(self, text: str) -> list[float]:
+        return with_retries(lambda: self.embeddings.embed_query(text), self.settings, "embed",
+                            self.settings.embed_timeout)
+
+
+class RetryingLLM:
+    """
+    OllamaLLM behind the retry / timeout policy. invoke() is retried as a whole; stream() only until the
+    first token, after that a failure is raised to the caller (it has already sent part of the answer)
+    """
+
+    def __init__(self, llm, settings: OllamaSettings):
+        self.llm = llm
+        self.settings = settings
+
+    def invoke(self, prompt):
+        return with_retries(lambda: self.llm.invoke(prompt), self.settings, "generate",
+                            self.settings.generate_timeout)
+
+    def stream(self, prompt):
+        settings = self.settings
+        for attempt in range(settings.retries + 1):
+            tokens = self.llm.stream(prompt)
+            started = False
+            try:
+                for token in tokens:
+                    started = True
+                    yield token
+                return
+            except Exception as e:
+                timeout_error = _timed_out(e, "generate", settings.generate_timeout)
+                if timeout_error is not None:
+                    raise timeout_error from e
+                if started or attempt == settings.retries or not is_transient(e):
+                    METRICS.inc("rag_ollama_errors_total", call="generate", reason="error")
+                    raise
+                delay = _backoff(settings, attempt)
+                print(f"🔄 Ollama stream failed ({e!r}), retry {attempt + 1}/{settings.retries} in {delay:.1f}s")
+                METRICS.inc("rag_ollama_retries_total", call="generate")
+            finally:
+                # closing the langchain stream closes the http response, which stops the generation in Ollama
+                tokens.close()
+            time.sleep(delay)
+
+
+def ollama_embeddings(model, settings: OllamaSettings | None = None):
+    from langchain_ollama import OllamaEmbeddings
+
+    settings = settings or OllamaSettings.from_env()
+    kwargs = {"model": model, "keep_alive": settings.keep_alive,
+              "client_kwargs": client_kwargs(settings, settings.embed_timeout)}
+    if settings.base_url:
+        kwargs["base_url"] = settings.base_url
+    return RetryingEmbeddings(OllamaEmbeddings(**kwargs), settings)
+
+
+def ollama_llm(model, settings: OllamaSettings | None = None):
+    from langchain_ollama import OllamaLLM
+
+    settings = settings or OllamaSettings.from_env()
+    kwargs = {"model": model, "keep_alive": settings.keep_alive,
+              "client_kwargs": client_kwargs(settings, settings.generate_timeout)}
+    if settings.base_url:
+        kwargs["base_url"] = settings.base_url
+    if settings.num_ctx:
+        kwargs["num_ctx"] = settings.num_ctx
+    if settings.num_predict:
+        kwargs["num_predict"] = settings.num_predict
+    return RetryingLLM(OllamaLLM(**kwargs), settings)
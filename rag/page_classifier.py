@@ -0,0 +1,51 @@
+# decides per page whether a pdf needs OCR.
+# born-digital pages already carry a good text layer and can be copied through as they are;
+# only scanned pages (no text) or garbled ones (broken font encodings, OCR junk) go to tesseract.
+
+import re
+
+from pypdf import PdfReader
+
+# a word-like token: letters (plus apostrophes / hyphens / trailing punctuation) with at least one vowel.
+# garbled text layers are mostly runs of symbols and consonant soup that fail this
+_TOKEN = re.compile(r"\S+")
+_WORD_LIKE = re.compile(r"^[A-Za-zÀ-ÿ'’-]*[AEIOUYaeiouyÀ-ÿ][A-Za-zÀ-ÿ'’-]*[.,;:!?)\"”]*$")
+
+MIN_CHARS = 200
+MIN_WORD_RATIO = 0.6
+
+
+def text_quality(text):
+    """
+    returns (character count, ratio of tokens that look like dictionary words)
+    """
+    text = text or ""
+    chars = len(text.strip())
+    tokens = [token.lstrip("(\"“") for token in _TOKEN.findall(text)]
+    # numbers and table cells say nothing about whether the text layer is readable
+    tokens = [token for token in tokens if token and not re.fullmatch(r"[\d.,%$/()\-–:]+", token)]
+    if not tokens:
+        return chars, 0.0
+    word_like = sum(1 for token in tokens if 1 < len(token) <= 25 and _WORD_LIKE.match(token))
+    return chars, word_like / len(tokens)
+
+
+def needs_ocr(text, min_chars=MIN_CHARS, min_word_ratio=MIN_WORD_RATIO):
+    chars, word_ratio = text_quality(text)
+    return chars < min_chars or word_ratio < min_word_ratio
+
+
+def classify_pages(pdf_path, min_chars=MIN_CHARS, min_word_ratio=MIN_WORD_RATIO):
+    """
+    returns one bool per page: True when the page should be OCR'd
+    """
+    reader = PdfReader(str(pdf_path))
+    decisions = []
+    for page in reader.pages:
+        try:
+            text = page.extract_text()
+        except Exception:
+            # a text layer pypdf can't even decode is as good as none
+            text = ""
+        decisions.append(needs_ocr(text, min_chars, min_word_ratio))
+    return decisions
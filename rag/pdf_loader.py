@@ -0,0 +1,52 @@
+# parallel pdf parsing for populate_database_pc.py.
+# PyPDFLoader is pure python and CPU bound, so one process per core parses whole pdfs and sends the pages back;
+# documents are yielded one at a time as they finish, so splitting / embedding can start on the first pdf
+# while the others are still being parsed, and only a few parsed pdfs are held in memory at once.
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+def load_pdf(path):
+    """
+    worker: all pages of one pdf as Documents (metadata "source" and "page", like PyPDFLoader.load())
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    start = time.perf_counter()
+    pages = PyPDFLoader(path).load()
+    return path, pages, time.perf_counter() - start
+
+
+def iter_documents(paths, workers=None, loader=load_pdf):
+    """
+    yields (path, pages, parse seconds) per pdf in completion order.
+    workers=1 parses in this process; otherwise at most 2 * workers pdfs are parsed or waiting at a time.
+    """
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(paths)))
+    if workers == 1:
+        for path in paths:
+            yield loader(path)
+        return
+
+    pending = set()
+    remaining = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for path in remaining:
+                pending.add(executor.submit(loader, path))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        pending.add(executor.submit(loader, next_path))
+        finally:
+            # the consumer stopped early (or a pdf failed): don't parse the rest
+            for future in pending:
+                future.cancel()
@@ -1,22 +1,28 @@
 import argparse
 import os
-import shutil
+import threading
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema.document import Document
 from get_embedding_function import get_embedding_function
+from rag.index_version import write_index_version
+from rag.ingest_pipeline import run_ingest_pipeline
+from rag.ingest_manifest import chunk_hash, file_hash, load_manifest, manifest_version, plan_changes, save_manifest
+from rag.lexical_index import LEXICAL_INDEX_PATH, update_lexical_index
+from rag.lexical_index import exists as lexical_index_exists
+from rag.lexical_index import index_digest as lexical_index_digest
+from rag.local_index import LOCAL_INDEX_PATH, LocalVectorStore
+from rag.metrics import METRICS
+from rag.pdf_loader import iter_documents
 
 # using pinecone for vector store bc chroma does not support cosine similarity well (lots of conversions need to be made)
-# pip install -qU langchain-pinecone
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone as PineconeClient
+# pip install -qU pinecone (imported by pinecone_index(), so --backend local works without it)
 
 # to iterate over multiple PDF files
 from glob import glob
 
-# for when we have access to the OpenAI Key 
-from langchain_openai import OpenAIEmbeddings
+# for when we have access to the OpenAI Key (slow to import, so only uncomment when it is used)
+# from langchain_openai import OpenAIEmbeddings
 
 # for semantic chunking (commented out for now)
 # from langchain_text_splitters import SemanticChunker
@@ -31,6 +37,8 @@ load_dotenv()
 # open_api_key=os.getenv("OPEN_API_KEY")
 pinecone_api_key=os.getenv("PINECONE_API_KEY")
 pinecone_index_name=os.getenv("PINECONE_INDEX_NAME")
+# optional: talk to the index host directly (skips describe_index; also how the benchmarks point at a fake)
+pinecone_index_host=os.getenv("PINECONE_INDEX_HOST") or None
 
 
 DATA_PATH = glob("rag/processed_pdfs/*.pdf")
@@ -40,26 +48,154 @@ def main():
 
     # the ArgumentParser helps to handle cmd line inputs
     parser = argparse.ArgumentParser()
-
-    # create or update the data store
-    documents = load_documents()
-    print(f"First document content preview: {documents[0].page_content[:500] if documents else 'No documents loaded'}")
-
-    chunks = split_documents(documents)
-    print(f"Created {len(chunks)} chunks.")
-    print(f"First chunk content preview: {chunks[0].page_content[:500] if chunks else 'No chunks created'}")
-
-    add_to_pinecone(chunks)
-
-def load_documents():
+    parser.add_argument("--backend", choices=["pinecone", "local", "both"], default="pinecone",
+                        help="where to write the vectors (local = memory-mapped index used by RAG_VECTOR_BACKEND=local)")
+    parser.add_argument("--local-index-path", default=LOCAL_INDEX_PATH, help="directory of the local index")
+    parser.add_argument("--quantize", choices=["int8"], default=None, help="store the local index as int8")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only load, split and upload PDFs / chunks that changed since the last run")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embedding / upsert batch")
+    parser.add_argument("--embed-workers", type=int, default=4, help="concurrent embedding batches")
+    parser.add_argument("--upsert-workers", type=int, default=2, help="concurrent upsert batches")
+    parser.add_argument("--queue-size", type=int, default=4, help="embedded batches waiting for upsert")
+    parser.add_argument("--retries", type=int, default=3, help="retries per failed upsert batch")
+    parser.add_argument("--load-workers", type=int, default=os.cpu_count(),
+                        help="processes parsing PDFs (1 = in this process)")
+    parser.add_argument("--lexical-index-path", default=LEXICAL_INDEX_PATH,
+                        help="directory of the BM25 index used for hybrid / lexical retrieval")
+    parser.add_argument("--no-lexical", action="store_true", help="don't update the BM25 index")
+    args = parser.parse_args()
+    pipeline_options = {
+        "batch_size": args.batch_size,
+        "embed_workers": args.embed_workers,
+        "upsert_workers": args.upsert_workers,
+        "queue_size": args.queue_size,
+        "retries": args.retries,
+    }
+
+    # each backend remembers what it was last given
+    manifest_path = f"rag/ingest_manifest_{args.backend}.json"
+    manifest = load_manifest(manifest_path)
+
+    if args.incremental:
+        changed_files, removed_files = plan_changes(manifest, DATA_PATH)
+        print(f"{len(changed_files)} changed, {len(removed_files)} removed, "
+              f"{len(DATA_PATH) - len(changed_files)} unchanged PDFs")
+        lexical_current = args.no_lexical or lexical_index_exists(args.lexical_index_path)
+        if not changed_files and not removed_files and lexical_current:
+            print("Nothing to do, the index is up to date.")
+            return
+    else:
+        changed_files = {path: file_hash(path) for path in DATA_PATH}
+        removed_files = [path for path in manifest["files"] if path not in changed_files]
+
+    # create or update the data store.
+    # pdfs are parsed in parallel and split one document at a time; the chunks stream straight into the
+    # embedding pipeline, which starts on the first pdf while the others are still being parsed
+    new_files = {path: {"sha256": h, "chunks": {}} for path, h in changed_files.items()}
+    chunks = []  # every chunk, for the lexical index
+    counts = {"upsert": 0}
+
+    def chunks_to_upsert():
+        for chunk in stream_chunks(list(changed_files), workers=args.load_workers):
+            # per-file chunk hashes for the new manifest
+            source_chunks = new_files[chunk.metadata["source"]]["chunks"]
+            source_chunks[chunk.metadata["id"]] = chunk_hash(chunk)
+            chunks.append(chunk)
+            # only chunks whose text changed are re-embedded and upserted
+            if args.incremental and (manifest["files"].get(chunk.metadata["source"], {}).get("chunks", {})
+                                     .get(chunk.metadata["id"]) == source_chunks[chunk.metadata["id"]]):
+                continue
+            counts["upsert"] += 1
+            yield chunk
+
+    failed_ids = set()
+    if args.backend == "both":
+        # two consumers: materialize once instead of parsing everything twice
+        to_upsert = list(chunks_to_upsert())
+        with METRICS.span("add_to_pinecone"):
+            failed_ids.update(add_to_pinecone(to_upsert, **pipeline_options).failed_ids)
+        with METRICS.span("add_to_local_index"):
+            failed_ids.update(add_to_local_index(to_upsert, path=args.local_index_path, quantize=args.quantize,
+                                                 **pipeline_options).failed_ids)
+    elif args.backend == "pinecone":
+        with METRICS.span("add_to_pinecone"):
+            failed_ids.update(add_to_pinecone(chunks_to_upsert(), **pipeline_options).failed_ids)
+    else:
+        with METRICS.span("add_to_local_index"):
+            failed_ids.update(add_to_local_index(chunks_to_upsert(), path=args.local_index_path,
+                                                 quantize=args.quantize, **pipeline_options).failed_ids)
+
+    # ids from the previous run that no longer exist (page got shorter after re-OCR, pdf removed, ...)
+    stale_ids = []
+    for path in list(changed_files) + removed_files:
+        old_ids = manifest["files"].get(path, {}).get("chunks", {})
+        new_ids = new_files.get(path, {}).get("chunks", {})
+        stale_ids.extend(chunk_id for chunk_id in old_ids if chunk_id not in new_ids)
+
+    print(f"{len(chunks)} chunks from {len(changed_files)} PDFs, {counts['upsert']} upserted, "
+          f"{len(stale_ids)} stale chunks to delete")
+    if args.backend in ("pinecone", "both"):
+        delete_from_pinecone(stale_ids)
+    if args.backend in ("local", "both"):
+        delete_from_local_index(stale_ids, path=args.local_index_path)
+
+    # BM25 index for hybrid / lexical retrieval. it does not depend on the embeddings, so it gets every chunk;
+    # it has to cover all pdfs, so the very first build reads them all even on an --incremental run
+    if not args.no_lexical:
+        lexical_chunks = chunks
+        if not lexical_index_exists(args.lexical_index_path) and set(changed_files) != set(DATA_PATH):
+            print("No lexical index yet, indexing all PDFs...")
+            lexical_chunks = list(stream_chunks(DATA_PATH, workers=args.load_workers))
+        with METRICS.span("lexical_index"):
+            update_lexical_index(lexical_chunks, stale_ids, path=args.lexical_index_path)
+
+    # chunks that never made it are left out of the manifest, and their file is marked as not ingested,
+    # so the next --incremental run picks them up again
+    for path, entry in new_files.items():
+        failed_here = [chunk_id for chunk_id in entry["chunks"] if chunk_id in failed_ids]
+        for chunk_id in failed_here:
+            del entry["chunks"][chunk_id]
+        if failed_here:
+            entry["sha256"] = None
+
+    for path in removed_files:
+        manifest["files"].pop(path, None)
+    manifest["files"].update(new_files)
+    save_manifest(manifest, manifest_path)
+
+    # the index changed, so answers cached against the old one are no longer valid.
+    # the BM25 index is part of it: it can be built without any pdf changing (e.g. its first build), and
+    # running servers only re-open their indexes when the version moves
+    version = manifest_version(manifest)
+    lexical_digest = lexical_index_digest(args.lexical_index_path)
+    write_index_version(f"{version}-{lexical_digest}" if lexical_digest else version)
+
+    # per-stage timings of this run (batch-level embed / upsert spans included)
+    print(METRICS.summary())
+
+def load_documents(paths=None, workers=1):
+    if paths is None:
+        paths = DATA_PATH
     all_docs = []
-    for path in DATA_PATH:
-        loader = PyPDFLoader(path)
-        docs = loader.load()
-        all_docs.extend(docs)
-    print(f"Loaded {len(all_docs)} pages from {len(DATA_PATH)} PDFs")
+    for _path, pages, seconds in iter_documents(paths, workers=workers):
+        METRICS.observe("rag_stage_seconds", seconds, stage="load_pdf")
+        all_docs.extend(pages)
+    print(f"Loaded {len(all_docs)} pages from {len(paths)} PDFs")
     return all_docs
 
+def stream_chunks(paths=None, workers=None):
+    """
+    yields chunks (with ids) one pdf at a time, while the remaining pdfs are parsed in worker processes
+    """
+    if paths is None:
+        paths = DATA_PATH
+    for _path, pages, seconds in iter_documents(paths, workers=workers):
+        METRICS.observe("rag_stage_seconds", seconds, stage="load_pdf")
+        with METRICS.span("split_documents"):
+            chunks = calculate_chunk_ids(split_documents(pages))
+        yield from chunks
+
 def split_documents(documents: list [Document]):
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
@@ -76,27 +212,95 @@ def split_documents(documents: list [Document]):
 
 
 
-def add_to_pinecone(chunks: list[Document]):
+def pinecone_index():
+    from pinecone import Pinecone as PineconeClient
 
-    # initialize pinecone client and index
     pc = PineconeClient(api_key=pinecone_api_key)
-    index = pc.Index(pinecone_index_name)
-
-    # load the current database
-    db = PineconeVectorStore(
-        index=index,
-        embedding=get_embedding_function(),
-        text_key="text",  # or "page_content" depending on how you chunk
-    )
-    
-    # calculate page ids
-    chunks_with_ids = calculate_chunk_ids(chunks)
+    if pinecone_index_host:
+        return pc.Index(host=pinecone_index_host)
+    return pc.Index(pinecone_index_name)
 
-    new_chunk_ids = [chunk.metadata["id"] for chunk in chunks_with_ids]
+def add_to_pinecone(chunks, **pipeline_options):
+    # chunks: list or iterator of Documents; an iterator is consumed as the pipeline goes
 
-    print(f"Upserting {len(new_chunk_ids)} chunks to Pinecone index...")
-    db.add_documents(documents=chunks_with_ids, ids=new_chunk_ids)
-    print("Documents uploaded to Pinecone successfully.")
+    # initialize pinecone client and index
+    index = pinecone_index()
+    embedding_function = get_embedding_function()
+
+    # calculate page ids (main() / stream_chunks already did this)
+    chunks_with_ids = _with_ids(chunks)
+
+    def embed(texts):
+        with METRICS.span("embed_batch"):
+            return embedding_function.embed_documents(texts)
+
+    def upsert(batch, vectors):
+        # same record layout as PineconeVectorStore(text_key="text") so query_rag reads it back unchanged
+        with METRICS.span("pinecone_upsert_batch"):
+            index.upsert(vectors=[
+                {"id": chunk.metadata["id"], "values": vector, "metadata": {**chunk.metadata, "text": chunk.page_content}}
+                for chunk, vector in zip(batch, vectors)
+            ])
+
+    print("Upserting chunks to Pinecone index...")
+    # the Ollama client layer already retries embeddings (OLLAMA_RETRIES), only upserts are retried here
+    stats = run_ingest_pipeline(chunks_with_ids, embed, upsert, **{"embed_retries": 0, **pipeline_options})
+    print("Documents uploaded to Pinecone successfully." if not stats.failed_ids
+          else f"❌ {len(stats.failed_ids)} chunks could not be uploaded, re-run with --incremental to retry them.")
+    return stats
+
+def delete_from_pinecone(ids: list[str], batch_size=1000):
+    if not ids:
+        return
+    index = pinecone_index()
+    # pinecone accepts at most 1000 ids per delete call
+    for start in range(0, len(ids), batch_size):
+        index.delete(ids=ids[start:start + batch_size])
+    print(f"Deleted {len(ids)} stale chunks from Pinecone.")
+
+def add_to_local_index(chunks, path=LOCAL_INDEX_PATH, quantize=None, **pipeline_options):
+
+    # same ids and metadata as the pinecone upload, so either backend returns the same sources
+    db = LocalVectorStore(path=path, quantize=quantize)
+    embedding_function = get_embedding_function()
+
+    chunks_with_ids = _with_ids(chunks)
+
+    def embed(texts):
+        with METRICS.span("embed_batch"):
+            return embedding_function.embed_documents(texts)
+
+    # the local index is rewritten as a whole, so collect the embedded batches and write once at the end
+    ids, vectors, texts, metadatas = [], [], [], []
+    collect_lock = threading.Lock()
+
+    def collect(batch, batch_vectors):
+        with collect_lock:
+            for chunk, vector in zip(batch, batch_vectors):
+                ids.append(chunk.metadata["id"])
+                vectors.append(vector)
+                texts.append(chunk.page_content)
+                metadatas.append(chunk.metadata)
+
+    stats = run_ingest_pipeline(chunks_with_ids, embed, collect, **{"embed_retries": 0, **pipeline_options})
+    if ids:
+        print(f"Writing {len(ids)} chunks to the local index at {path}...")
+        with METRICS.span("local_index_write"):
+            db.upsert_vectors(ids, vectors, texts, metadatas)
+        print("Local index written successfully.")
+    return stats
+
+def delete_from_local_index(ids: list[str], path=LOCAL_INDEX_PATH):
+    if not ids:
+        return
+    LocalVectorStore(path=path).delete(ids)
+    print(f"Deleted {len(ids)} stale chunks from the local index.")
+
+def _with_ids(chunks):
+    # lists without ids get them here; iterators come from stream_chunks, which already set them
+    if isinstance(chunks, list) and not all("id" in chunk.metadata for chunk in chunks):
+        return calculate_chunk_ids(chunks)
+    return chunks
 
 def calculate_chunk_ids(chunks):
     # creates ids like rag/rag_data/mentor_canada_resources/rag/rag_data
@@ -1,13 +1,17 @@
 import argparse
-import os
+import random
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 
-from pinecone import Pinecone as PineconeClient
-from langchain_pinecone import PineconeVectorStore
-
-from langchain.prompts import ChatPromptTemplate
-from langchain_ollama import OllamaLLM
-from get_embedding_function import get_embedding_function
+from rag.admission import normalize_query
+from rag.citations import format_context, render_references, with_references
+from rag.context_builder import build_context, estimate_tokens, mmr_order
+from rag.index_version import read_index_version
+from rag.lexical_index import reciprocal_rank_fusion
+from rag.metrics import METRICS
+from rag.ollama_client import is_transient
+from rag.runtime import RagRuntime, get_runtime
 
 PROMPT_TEMPLATE = """
 You are a domain expert in mentorship. The context that you are receiving is extracted from multiple reports detailing mentorship findings,
@@ -16,9 +20,8 @@ disjoint, ensure that you are attempting to specify the situation as much as pos
 a mentor, and if you come across a chunk that addresses this question specific to newcomer youth, include this context (e.g., "For 
 newcomer youth, a good mentor may ..."). However, do not focus the response on one group unless specifically asked to do so.
 
-Please add the sources of the documents in the database from which you construct the answer. For example i want this indicated as subscripted 
-numbers through the text response in addition to these numbers and sources are indicated at the bottom of the response. In the references section,
-it should only be a number accompanied by the name of the orginal pdf that this chunk came from.
+Each passage of the context starts with a number in square brackets. When you use information from a passage, cite it inline
+with that number, e.g. [2] or [1][3]. Do not write a references or sources section, it is added for you.
 
 Produce a response that is conversational in tone but maintains the level of nuance needed when delivering information that may be sensitive. 
 Responses should avoid run on sentences and listing things extensively. The flow of the response should be smooth and while maintaining a high 
@@ -41,44 +44,238 @@ def main():
     parser.add_argument("query_text", type=str, help="The query text.")
     args = parser.parse_args()
     query_text = args.query_text
-    query_rag(query_text)
+    # the answer ends with its References section; the chunk ids are logged by answer_query
+    print(f"Response: {query_rag(query_text)}")
 
 
-def query_rag(query_text:str):
+def query_rag(query_text:str, runtime: RagRuntime | None = None):
 
-    # load the database with the embeddings
-    embedding_function = get_embedding_function()
+    # the embeddings, pinecone index, prompt and LLM live in the shared runtime
+    # so only per-query work happens here
+    if runtime is None:
+        runtime = get_runtime()
 
-    pc = PineconeClient(api_key=os.getenv("PINECONE_API_KEY"))
-    index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+    # identical questions asked at the same time share one computation
+    return runtime.single_flight.do(normalize_query(query_text), lambda: answer_query(query_text, runtime))
 
-    db = PineconeVectorStore(index=index, embedding=embedding_function, text_key="text")
 
+def answer_query(query_text:str, runtime: RagRuntime):
+    start = time.perf_counter()
 
-    # search the database
-    results = db.similarity_search_with_score(query_text, k=5)
+    # pick up a re-ingest before anything reads the indexes
+    index_version = read_index_version()
+    runtime.refresh(index_version)
 
-    if not results:
-        print("No relevant documents retrieved for this query.")
-    else:
-        for doc, score in results:
-            print(f"Score: {score}, ID: {doc.metadata.get('id')}, Content preview: {doc.page_content[:300]}")
+    # embed once: the same vector is used for the answer cache and the vector search
+    query_vector = embed_query(query_text, runtime)
+
+    cached = lookup_cached_answer(query_vector, index_version, runtime)
+    if cached is not None:
+        METRICS.inc("rag_requests_total", mode="ask", outcome="cache_hit")
+        METRICS.observe("rag_stage_seconds", time.perf_counter() - start, stage="total")
+        return cached["answer"]
 
+    # raises Overloaded when too many generations are already queued
+    with runtime.llm_gate.slot():
+        results = retrieve(query_vector, runtime, query_text)
+        prompt = build_prompt(query_text, results, runtime)
 
-    context_text = "\n\n---\n\n".join([doc.page_content for doc, _score in results])
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-    prompt = prompt_template.format(context=context_text, question=query_text)
-    print(prompt)
+        generation_start = time.perf_counter()
+        response_text = runtime.model.invoke(prompt)
+        record_generation(time.perf_counter() - generation_start, estimate_tokens(response_text))
 
-    model = OllamaLLM(model="mistral")
-    response_text = model.invoke(prompt)
+    # the References section is rendered from the chunk metadata, not generated
+    with METRICS.span("references"):
+        response_text = with_references(response_text, results)
 
     sources = [doc.metadata.get("id", None) for doc, _score in results]
-    formatted_response = f"Response: {response_text}\nSources: {sources}"
-    print(formatted_response)
+    print(f"Answered with sources: {sources}")
+
+    store_answer(query_text, query_vector, response_text, results, index_version, runtime)
+    METRICS.inc("rag_requests_total", mode="ask", outcome="generated")
+    METRICS.observe("rag_stage_seconds", time.perf_counter() - start, stage="total")
     return response_text
 
 
+def stream_rag(query_text:str, runtime: RagRuntime | None = None):
+    """
+    streaming version of query_rag. yields (event, data) tuples:
+    one "sources" event with the retrieval metadata, then a "token" event per LLM chunk, then "done".
+    closing the generator (e.g. the client disconnected) closes the LLM stream and stops generation.
+    Overloaded is raised before the first event, so callers can advance it once to fail fast.
+    """
+    if runtime is None:
+        runtime = get_runtime()
+    start = time.perf_counter()
+
+    index_version = read_index_version()
+    runtime.refresh(index_version)
+    query_vector = embed_query(query_text, runtime)
+
+    cached = lookup_cached_answer(query_vector, index_version, runtime)
+    if cached is not None:
+        METRICS.inc("rag_requests_total", mode="stream", outcome="cache_hit")
+        yield "sources", cached["sources"]
+        yield "token", cached["answer"]
+        yield "done", {"cached": True}
+        return
+
+    # the LLM slot is held until the stream ends or the client goes away
+    with runtime.llm_gate.slot():
+        results = retrieve(query_vector, runtime, query_text)
+        sources = source_metadata(results)
+        yield "sources", sources
+
+        prompt = build_prompt(query_text, results, runtime)
+
+        generation_start = time.perf_counter()
+        tokens = runtime.model.stream(prompt)
+        parts = []
+        try:
+            for token in tokens:
+                if not parts:
+                    METRICS.observe("rag_stage_seconds", time.perf_counter() - start, stage="first_token")
+                parts.append(token)
+                yield "token", token
+        finally:
+            tokens.close()
+            # ollama streams one token per chunk
+            record_generation(time.perf_counter() - generation_start, len(parts))
+
+    answer = "".join(parts)
+    with METRICS.span("references"):
+        references = render_references(answer, results)
+    if references:
+        yield "references", references
+        answer = f"{answer.rstrip()}\n\n{references}"
+
+    # only reached when generation finished, so a disconnected client never caches half an answer
+    store_answer(query_text, query_vector, answer, results, index_version, runtime)
+    METRICS.inc("rag_requests_total", mode="stream", outcome="generated")
+    METRICS.observe("rag_stage_seconds", time.perf_counter() - start, stage="total")
+    yield "done", {"cached": False}
+
+
+def record_generation(seconds, completion_tokens):
+    METRICS.observe("rag_stage_seconds", seconds, stage="generation")
+    METRICS.observe("rag_completion_tokens", completion_tokens)
+    if seconds > 0:
+        METRICS.observe("rag_generation_tokens_per_second", completion_tokens / seconds)
+
+
+def embed_query(query_text:str, runtime: RagRuntime):
+    """
+    the query embedding, or None when retrieval goes lexical-only: RAG_RETRIEVAL_MODE=lexical, or the
+    embedding service is slow / down and a lexical index is available. after a timeout or a connection
+    error the embedding is skipped for RAG_EMBED_COOLDOWN seconds, so later queries don't each wait for it.
+    any other error (bad input, a bug) is raised and leaves the embedding path alone.
+    """
+    if runtime.lexical is None:
+        with METRICS.span("embed"):
+            return runtime.embedding_function.embed_query(query_text)
+
+    settings = runtime.settings
+    if settings.retrieval_mode == "lexical":
+        return None
+    if time.monotonic() < runtime.embed_down_until:
+        METRICS.inc("rag_lexical_fallback_total", reason="cooldown")
+        return None
+
+    future = runtime.embed_executor.submit(runtime.embedding_function.embed_query, query_text)
+    try:
+        with METRICS.span("embed"):
+            return future.result(timeout=settings.embed_timeout)
+    except Exception as e:
+        timed_out = isinstance(e, (FutureTimeoutError, TimeoutError))
+        if not timed_out and not is_transient(e):
+            raise
+        reason = "timeout" if timed_out else "error"
+        print(f"❌ Embedding {reason} ({e!r}), answering from the lexical index for the next "
+              f"{settings.embed_cooldown:.0f}s")
+        runtime.embed_down_until = time.monotonic() + settings.embed_cooldown
+        METRICS.inc("rag_lexical_fallback_total", reason=reason)
+        return None
+
+
+def lookup_cached_answer(query_vector, index_version, runtime: RagRuntime):
+    # no vector on the lexical fast path, so no semantic cache either
+    if runtime.answer_cache is None or query_vector is None:
+        return None
+    with METRICS.span("cache_lookup"):
+        cached = runtime.answer_cache.lookup(query_vector, index_version)
+    if cached is not None:
+        print(f"Answer cache hit (similarity {cached['similarity']:.3f}) for: {cached['query']}")
+    return cached
+
+
+def store_answer(query_text, query_vector, answer, results, index_version, runtime: RagRuntime):
+    if runtime.answer_cache is not None and query_vector is not None and results:
+        runtime.answer_cache.store(query_text, query_vector, answer, source_metadata(results), index_version)
+
+
+def source_metadata(results):
+    return [
+        {"id": doc.metadata.get("id"), "page": doc.metadata.get("page"), "score": score}
+        for doc, score in results
+    ]
+
+
+def retrieve(query_vector, runtime: RagRuntime, query_text:str | None = None):
+
+    # search the database: over-fetch, then keep a diverse, de-duplicated set that fits the token budget
+    settings = runtime.settings
+    fetch_k = max(settings.fetch_k, settings.top_k)
+    lexical = runtime.lexical if query_text is not None else None
+    # MMR needs the query vector and every candidate's vector; BM25-only rankings keep their own order
+    mmr_vector = query_vector
+
+    if query_vector is None:
+        # lexical-only fast path, no embedding
+        with METRICS.span("lexical_search"):
+            candidates = [(doc, score, None) for doc, score in lexical.search(query_text, k=fetch_k)]
+    else:
+        with METRICS.span("search", backend=settings.vector_backend):
+            candidates = runtime.search(query_vector, k=fetch_k)
+        if lexical is not None and settings.retrieval_mode == "hybrid":
+            with METRICS.span("lexical_search"):
+                lexical_hits = lexical.search(query_text, k=fetch_k)
+            # BM25 hits carry no vectors, so MMR diversifies the dense ranking before it is fused
+            if candidates and all(vector is not None for _, _, vector in candidates):
+                order = mmr_order(query_vector, [vector for _, _, vector in candidates], settings.mmr_lambda)
+                candidates = [candidates[index] for index in order]
+            candidates = reciprocal_rank_fusion([candidates, lexical_hits], k=settings.rrf_k)
+            mmr_vector = None
+
+    with METRICS.span("context"):
+        results = build_context(
+            mmr_vector,
+            candidates,
+            max_chunks=settings.top_k,
+            token_budget=settings.context_token_budget,
+            lambda_mult=settings.mmr_lambda,
+        )
+
+    if not results:
+        print("No relevant documents retrieved for this query.")
+    else:
+        print(f"Kept {len(results)} of {len(candidates)} retrieved chunks: {[doc.metadata.get('id') for doc, _ in results]}")
+    return results
+
+
+def build_prompt(query_text:str, results, runtime: RagRuntime):
+    with METRICS.span("prompt_format"):
+        context_text = format_context(results)
+        prompt = runtime.prompt_template.format(context=context_text, question=query_text)
+
+    prompt_tokens = estimate_tokens(prompt)
+    METRICS.observe("rag_prompt_tokens", prompt_tokens)
+    # printing every full prompt is itself measurable I/O under load, so it is sampled (RAG_PROMPT_LOG_SAMPLE)
+    if random.random() < runtime.settings.prompt_log_sample:
+        print(prompt)
+    print(f"Prompt tokens (estimated): {prompt_tokens}, context tokens: {estimate_tokens(context_text)}")
+    return prompt
+
+
 if __name__ == "__main__":
     main()
 
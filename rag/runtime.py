@@ -0,0 +1,264 @@
+# process-wide RAG runtime
+# the embedding model, the pinecone index handle, the vector store, the parsed prompt and
+# the LLM are all built once and shared by every request instead of being rebuilt on each /ask.
+# langchain, pinecone, ollama and numpy are imported when the runtime is first built, not when this
+# module is imported, so the static pages of app.py start without paying for them.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+from rag.admission import AdmissionGate, SingleFlight
+
+# get variables from .env file
+load_dotenv()
+
+
+@dataclass(frozen=True)
+class RagSettings:
+    """
+    configuration for the RAG runtime, read from environment variables (.env)
+    """
+    vector_backend: str
+    local_index_path: str
+    pinecone_api_key: str | None
+    pinecone_index_name: str | None
+    pinecone_index_host: str | None
+    pinecone_pool_threads: int
+    ollama: "OllamaSettings"  # from rag.ollama_client, which imports langchain
+    llm_model: str
+    top_k: int
+    fetch_k: int
+    context_token_budget: int
+    mmr_lambda: float
+    retrieval_mode: str
+    lexical_index_path: str
+    rrf_k: int
+    embed_timeout: float
+    embed_cooldown: float
+    prompt_log_sample: float
+    answer_cache_enabled: bool
+    answer_cache_threshold: float
+    answer_cache_max_entries: int
+    answer_cache_ttl_seconds: float
+    answer_cache_path: str | None
+    llm_max_concurrency: int
+    llm_max_queue: int
+    llm_max_wait_seconds: float
+
+    @classmethod
+    def from_env(cls):
+        from rag.ollama_client import OllamaSettings
+
+        return cls(
+            # "pinecone" or "local" (the memory-mapped index exported by populate_database_pc.py)
+            vector_backend=os.getenv("RAG_VECTOR_BACKEND", "pinecone"),
+            local_index_path=os.getenv("RAG_LOCAL_INDEX_PATH", "rag/local_index"),
+            pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+            pinecone_index_name=os.getenv("PINECONE_INDEX_NAME"),
+            # optional: skips the describe_index call when the host is already known
+            pinecone_index_host=os.getenv("PINECONE_INDEX_HOST") or None,
+            pinecone_pool_threads=int(os.getenv("PINECONE_POOL_THREADS", "4")),
+            # connection pool, timeouts, retries, keep_alive and generation options (see rag/ollama_client.py)
+            ollama=OllamaSettings.from_env(),
+            llm_model=os.getenv("RAG_LLM_MODEL", "mistral"),
+            top_k=int(os.getenv("RAG_TOP_K", "5")),
+            # candidates fetched for the context builder, which keeps at most top_k of them within the budget
+            fetch_k=int(os.getenv("RAG_FETCH_K", "20")),
+            context_token_budget=int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500")),
+            mmr_lambda=float(os.getenv("RAG_MMR_LAMBDA", "0.7")),
+            # "dense", "hybrid" (dense + BM25, reciprocal rank fusion) or "lexical" (BM25 only, no embedding).
+            # hybrid / dense fall back to BM25 alone when the embedding is slower than RAG_EMBED_TIMEOUT or fails
+            retrieval_mode=os.getenv("RAG_RETRIEVAL_MODE", "hybrid"),
+            lexical_index_path=os.getenv("RAG_LEXICAL_INDEX_PATH", "rag/lexical_index"),
+            rrf_k=int(os.getenv("RAG_RRF_K", "60")),
+            embed_timeout=float(os.getenv("RAG_EMBED_TIMEOUT", "3")),
+            embed_cooldown=float(os.getenv("RAG_EMBED_COOLDOWN", "30")),
+            # share of requests whose full prompt is printed (0 = never, 1 = always)
+            prompt_log_sample=float(os.getenv("RAG_PROMPT_LOG_SAMPLE", "0")),
+            answer_cache_enabled=os.getenv("RAG_ANSWER_CACHE", "1") == "1",
+            answer_cache_threshold=float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.92")),
+            answer_cache_max_entries=int(os.getenv("RAG_ANSWER_CACHE_MAX_ENTRIES", "512")),
+            answer_cache_ttl_seconds=float(os.getenv("RAG_ANSWER_CACHE_TTL", str(24 * 3600))),
+            # e.g. rag/answer_cache.sqlite to persist answers and share them between workers
+            answer_cache_path=os.getenv("RAG_ANSWER_CACHE_PATH") or None,
+            # generations Ollama runs at once, how many more may wait, and for how long
+            llm_max_concurrency=int(os.getenv("RAG_LLM_MAX_CONCURRENCY", "2")),
+            llm_max_queue=int(os.getenv("RAG_LLM_MAX_QUEUE", "16")),
+            llm_max_wait_seconds=float(os.getenv("RAG_LLM_MAX_WAIT", "20")),
+        )
+
+
+class RagRuntime:
+    """
+    long-lived objects used by query_rag. build once at startup, share across threads.
+    """
+
+    def __init__(self, settings: RagSettings, prompt_template: str):
+        from langchain_core.prompts import ChatPromptTemplate
+        from get_embedding_function import get_embedding_function
+        from rag.ollama_client import ollama_llm
+        from rag.semantic_cache import SemanticCache
+
+        self.settings = settings
+        self.embedding_function = get_embedding_function(settings.ollama)
+
+        self.pinecone = None
+        self.index = None
+        if settings.vector_backend == "local":
+            from rag.local_index import LocalVectorStore
+            self.db = LocalVectorStore(path=settings.local_index_path, embedding=self.embedding_function)
+        elif settings.vector_backend == "pinecone":
+            from pinecone import Pinecone as PineconeClient
+            from langchain_pinecone import PineconeVectorStore
+
+            # the pinecone client keeps a urllib3 connection pool per index handle
+            self.pinecone = PineconeClient(
+                api_key=settings.pinecone_api_key, pool_threads=settings.pinecone_pool_threads
+            )
+            if settings.pinecone_index_host:
+                self.index = self.pinecone.Index(
+                    host=settings.pinecone_index_host, pool_threads=settings.pinecone_pool_threads
+                )
+            else:
+                self.index = self.pinecone.Index(
+                    settings.pinecone_index_name, pool_threads=settings.pinecone_pool_threads
+                )
+            self.db = PineconeVectorStore(index=self.index, embedding=self.embedding_function, text_key="text")
+        else:
+            raise ValueError(f"Unknown RAG_VECTOR_BACKEND: {settings.vector_backend!r} (expected 'pinecone' or 'local')")
+
+        # BM25 index written by populate_database_pc.py; without it retrieval is dense only
+        if settings.retrieval_mode not in ("dense", "hybrid", "lexical"):
+            raise ValueError(f"Unknown RAG_RETRIEVAL_MODE: {settings.retrieval_mode!r} "
+                             "(expected 'dense', 'hybrid' or 'lexical')")
+        self.lexical = self._open_lexical()
+        if self.lexical is None and settings.retrieval_mode == "lexical":
+            raise ValueError(f"RAG_RETRIEVAL_MODE=lexical but there is no lexical index at {settings.lexical_index_path}")
+
+        # the on-disk indexes above are re-opened when a re-ingest writes a new index version (see refresh)
+        from rag.index_version import read_index_version
+        self.index_version = read_index_version()
+        self._refresh_lock = threading.Lock()
+        # query embeddings run here so a slow Ollama can be timed out (see query_data_pc.embed_query)
+        self.embed_executor = ThreadPoolExecutor(max_workers=settings.ollama.max_connections,
+                                                 thread_name_prefix="embed")
+        self.embed_down_until = 0.0
+
+        # parse the prompt once, formatting it per request is cheap
+        self.prompt_template = ChatPromptTemplate.from_template(prompt_template)
+
+        # a stuck generation raises TimeoutError after OLLAMA_GENERATE_TIMEOUT seconds without a token
+        self.model = ollama_llm(settings.llm_model, settings.ollama)
+
+        self.single_flight = SingleFlight()
+        self.llm_gate = AdmissionGate(
+            max_concurrent=settings.llm_max_concurrency,
+            max_queue=settings.llm_max_queue,
+            max_wait=settings.llm_max_wait_seconds,
+        )
+
+        self.answer_cache = None
+        if settings.answer_cache_enabled:
+            self.answer_cache = SemanticCache(
+                threshold=settings.answer_cache_threshold,
+                max_entries=settings.answer_cache_max_entries,
+                ttl_seconds=settings.answer_cache_ttl_seconds,
+                path=settings.answer_cache_path,
+            )
+
+    def _open_lexical(self):
+        from rag import lexical_index
+
+        if lexical_index.exists(self.settings.lexical_index_path):
+            return lexical_index.LexicalIndex(self.settings.lexical_index_path)
+        return None
+
+    def refresh(self, index_version):
+        """
+        swaps in the local vector index and the BM25 index written by a re-ingest (populate_database_pc.py
+        writes the index version after both). cheap while the version is unchanged, so it runs per request.
+        requests already running keep the stores they started with.
+        """
+        if index_version == self.index_version:
+            return
+        with self._refresh_lock:
+            if index_version == self.index_version:
+                return
+            if self.settings.vector_backend == "local":
+                from rag.local_index import LocalVectorStore
+                self.db = LocalVectorStore(path=self.settings.local_index_path, embedding=self.embedding_function)
+            lexical = self._open_lexical()
+            if lexical is not None or self.settings.retrieval_mode != "lexical":
+                self.lexical = lexical
+            self.index_version = index_version
+        print(f"🔄 Reloaded the local indexes for index version {index_version}")
+
+    def search(self, query_vector, k):
+        """
+        returns [(Document, score, vector)] for the k nearest chunks, whichever backend is configured
+        """
+        if self.index is None:
+            return self.db.similarity_search_by_vector_with_vectors(query_vector, k=k)
+        from langchain_core.documents import Document
+
+        # query pinecone directly (not through PineconeVectorStore) so the vectors come back too
+        response = self.index.query(vector=list(query_vector), top_k=k, include_metadata=True, include_values=True)
+        results = []
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            text = metadata.pop("text", "")
+            results.append((Document(page_content=text, metadata=metadata), match.score, match.values))
+        return results
+
+
+# ---------------------------------------------------
+# process-wide instance
+# ---------------------------------------------------
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def current_runtime() -> RagRuntime | None:
+    """
+    the shared runtime if it has been built already, without building it
+    """
+    return _runtime
+
+
+def get_runtime(prompt_template: str | None = None) -> RagRuntime:
+    """
+    returns the shared runtime, building it on first use (double-checked so only one thread builds it)
+    """
+    global _runtime
+    runtime = _runtime
+    if runtime is not None:
+        return runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = _build(prompt_template)
+        return _runtime
+
+
+def reload_runtime(prompt_template: str | None = None) -> RagRuntime:
+    """
+    re-reads .env / environment and swaps in a freshly built runtime.
+    requests already running keep the old objects until they finish.
+    """
+    global _runtime
+    load_dotenv(override=True)
+    new_runtime = _build(prompt_template)
+    with _runtime_lock:
+        _runtime = new_runtime
+    return new_runtime
+
+
+def _build(prompt_template: str | None) -> RagRuntime:
+    if prompt_template is None:
+        # imported here to avoid a circular import (query_data_pc uses get_runtime)
+        from rag.query_data_pc import PROMPT_TEMPLATE
+        prompt_template = PROMPT_TEMPLATE
+    return RagRuntime(RagSettings.from_env(), prompt_template)
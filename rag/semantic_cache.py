@@ -0,0 +1,241 @@
+# semantic answer cache for query_rag
+# paraphrased questions ("what makes a good mentor" / "qualities of a good mentor") embed to nearly the
+# same vector, so when a new query is close enough to one we already answered we return the stored answer
+# and skip the vector search and the LLM entirely.
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    cosine-similarity answer cache with a size bound (LRU eviction), a TTL and index-version invalidation.
+
+    entries are held in memory by default. give a `path` to keep them in a SQLite file instead,
+    which survives restarts and is shared by every gunicorn worker pointing at the same file.
+    """
+
+    def __init__(self, threshold=0.92, max_entries=512, ttl_seconds=24 * 3600, path=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path:
+            self._backend = _SqliteBackend(path)
+        else:
+            self._backend = _MemoryBackend()
+
+    def lookup(self, query_vector, index_version):
+        """
+        returns {"query", "answer", "sources", "similarity"} for the closest cached query above the threshold, else None
+        """
+        query_vector = _normalize(query_vector)
+        with self._lock:
+            oldest_allowed = time.time() - self.ttl_seconds
+            found = self._backend.best_match(query_vector, index_version, oldest_allowed)
+            if found is not None and found["similarity"] >= self.threshold:
+                self._backend.touch(found["key"])
+                self.hits += 1
+                return found
+            self.misses += 1
+            return None
+
+    def store(self, query_text, query_vector, answer, sources, index_version):
+        with self._lock:
+            self._backend.insert(query_text, _normalize(query_vector), answer, sources, index_version)
+            self._backend.evict(self.max_entries)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._backend.size(),
+            }
+
+
+class _MemoryBackend:
+
+    def __init__(self):
+        # key -> entry dict, ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._version = None
+        # stacked, normalized vectors of all entries; rebuilt lazily after a change
+        self._matrix = None
+        self._keys = []
+
+    def best_match(self, query_vector, index_version, oldest_allowed):
+        if index_version != self._version:
+            # the index was re-ingested, every cached answer may cite chunks that no longer exist
+            self._entries.clear()
+            self._matrix = None
+            self._version = index_version
+
+        expired = [key for key, entry in self._entries.items() if entry["created"] < oldest_allowed]
+        for key in expired:
+            del self._entries[key]
+            self._matrix = None
+
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key]["vector"] for key in self._keys])
+
+        similarities = self._matrix @ query_vector
+        best = int(np.argmax(similarities))
+        entry = self._entries[self._keys[best]]
+        return {
+            "key": self._keys[best],
+            "query": entry["query"],
+            "answer": entry["answer"],
+            "sources": entry["sources"],
+            "similarity": float(similarities[best]),
+        }
+
+    def touch(self, key):
+        self._entries.move_to_end(key)
+
+    def insert(self, query_text, query_vector, answer, sources, index_version):
+        if index_version != self._version:
+            self._entries.clear()
+            self._version = index_version
+        self._entries[self._next_key] = {
+            "query": query_text,
+            "vector": query_vector,
+            "answer": answer,
+            "sources": sources,
+            "created": time.time(),
+        }
+        self._next_key += 1
+        self._matrix = None
+
+    def evict(self, max_entries):
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+            self._matrix = None
+
+    def size(self):
+        return len(self._entries)
+
+
+class _SqliteBackend:
+
+    def __init__(self, path):
+        # one connection guarded by SemanticCache._lock; WAL lets other workers read while we write
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        # vectors are cached in memory and only re-read when the file changed or the index version moved
+        # (data_version moves when another connection commits, our own writes reset the cache directly)
+        self._data_version = None
+        self._index_version = None
+        self._rows = None
+
+    def _load(self, index_version, oldest_allowed):
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._rows is not None and data_version == self._data_version and index_version == self._index_version:
+            return self._rows
+
+        self._conn.execute(
+            "DELETE FROM answers WHERE index_version != ? OR created < ?", (index_version, oldest_allowed)
+        )
+        self._conn.commit()
+        # a worker still on the old index may have written since the delete
+        rows = self._conn.execute(
+            "SELECT id, vector, created FROM answers WHERE index_version = ?", (index_version,)
+        ).fetchall()
+        ids = [row[0] for row in rows]
+        created = np.array([row[2] for row in rows], dtype=np.float64)
+        matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        self._rows = (ids, created, matrix)
+        self._data_version = data_version
+        self._index_version = index_version
+        return self._rows
+
+    def best_match(self, query_vector, index_version, oldest_allowed):
+        ids, created, matrix = self._load(index_version, oldest_allowed)
+        if matrix is None:
+            return None
+
+        similarities = matrix @ query_vector
+        # expired rows may still be in the in-memory copy until the next reload
+        similarities[created < oldest_allowed] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < 0:
+            return None
+
+        row = self._conn.execute(
+            "SELECT query, answer, sources FROM answers WHERE id = ?", (ids[best],)
+        ).fetchone()
+        if row is None:
+            # deleted by another worker since we loaded
+            self._rows = None
+            return None
+        return {
+            "key": ids[best],
+            "query": row[0],
+            "answer": row[1],
+            "sources": json.loads(row[2]),
+            "similarity": float(similarities[best]),
+        }
+
+    def touch(self, key):
+        self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), key))
+        self._conn.commit()
+
+    def insert(self, query_text, query_vector, answer, sources, index_version):
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO answers (query, vector, answer, sources, index_version, created, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (query_text, query_vector.astype(np.float32).tobytes(), answer, json.dumps(sources),
+             index_version, now, now),
+        )
+        self._conn.commit()
+        self._rows = None
+
+    def evict(self, max_entries):
+        cursor = self._conn.execute(
+            "DELETE FROM answers WHERE id IN ("
+            " SELECT id FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+        self._conn.commit()
+        if cursor.rowcount:
+            self._rows = None
+
+    def size(self):
+        return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
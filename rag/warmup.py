@@ -0,0 +1,69 @@
+# background warm-up of the RAG path at app boot.
+# the first /ask used to pay for importing langchain / pinecone, building the clients, and Ollama loading
+# mxbai-embed-large and mistral from disk. warm_up() does all of that before the first question arrives:
+# it builds the shared runtime, runs one uncached embedding (loads the embedding model), one vector query
+# (opens the pinecone connection pool) and an empty generation (loads the LLM without generating anything).
+# both models are sent with keep_alive = RAG_OLLAMA_KEEP_ALIVE (default -1), which keeps them pinned in memory.
+
+import threading
+import time
+
+from rag.metrics import METRICS
+
+_lock = threading.Lock()
+_state = {"status": "cold", "started": None, "seconds": None, "error": None, "steps": {}}
+
+
+def warmup_state():
+    with _lock:
+        return {**_state, "steps": dict(_state["steps"])}
+
+
+def _step(name, fn):
+    start = time.perf_counter()
+    with METRICS.span(f"warmup_{name}"):
+        result = fn()
+    with _lock:
+        _state["steps"][name] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def warm_up():
+    """
+    builds and exercises the runtime once; never raises (the outcome is in warmup_state())
+    """
+    from rag.embedding_cache import CachedEmbeddings
+    from rag.runtime import get_runtime
+
+    with _lock:
+        if _state["status"] in ("warming", "ready"):
+            return
+        _state.update(status="warming", started=time.time(), error=None)
+    start = time.perf_counter()
+    try:
+        runtime = _step("runtime", get_runtime)
+
+        # bypass the embedding cache, a cache hit would not load the model
+        embeddings = runtime.embedding_function
+        if isinstance(embeddings, CachedEmbeddings):
+            embeddings = embeddings.embeddings
+        vector = _step("embedding_model", lambda: embeddings.embed_query("What makes a good mentor?"))
+
+        _step("vector_store", lambda: runtime.search(vector, k=1))
+        # an empty prompt only loads the model into memory
+        _step("llm", lambda: runtime.model.invoke(""))
+    except Exception as e:
+        print(f"❌ RAG warm-up failed: {e}")
+        with _lock:
+            _state.update(status="failed", error=str(e), seconds=round(time.perf_counter() - start, 3))
+        return
+
+    with _lock:
+        _state.update(status="ready", seconds=round(time.perf_counter() - start, 3))
+    print(f"✅ RAG path warmed up in {_state['seconds']}s: {_state['steps']}")
+
+
+def start_warmup():
+    thread = threading.Thread(target=warm_up, name="rag-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,5 @@
+# lets a plain `pytest` (not only `python -m pytest`) import the rag package from the repo root
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
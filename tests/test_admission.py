@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from rag.admission import AdmissionGate, Overloaded, SingleFlight, normalize_query
+
+
+def test_normalize_query_ignores_case_spacing_and_punctuation():
+    assert normalize_query("What makes a  good mentor?") == normalize_query("what makes a good mentor")
+    assert normalize_query(None) == ""
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [start(lambda: results.append(flight.do("q", compute))) for _ in range(4)]
+    while flight.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["answer"] * 4
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 3}
+
+
+def test_single_flight_passes_the_error_to_every_caller_then_forgets_it():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("q", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [start(call) for _ in range(3)]
+    while flight.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    # the next call runs again instead of replaying the failure
+    assert flight.do("q", lambda: "ok") == "ok"
+
+
+def test_gate_limits_concurrency_and_times_out_waiters():
+    gate = AdmissionGate(max_concurrent=1, max_queue=4, max_wait=0.05)
+    with gate.slot():
+        assert gate.stats()["running"] == 1
+        with pytest.raises(Overloaded) as raised:
+            with gate.slot():
+                pass
+    assert raised.value.reason == "busy"
+    assert raised.value.retry_after >= 1
+
+    stats = gate.stats()
+    assert (stats["running"], stats["admitted"], stats["timed_out"]) == (0, 1, 1)
+    # the slot was given back
+    with gate.slot():
+        pass
+
+
+def test_gate_rejects_immediately_when_the_queue_is_full():
+    gate = AdmissionGate(max_concurrent=1, max_queue=1, max_wait=5)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with gate.slot():
+            holding.set()
+            release.wait(5)
+
+    def wait_for_slot():
+        with gate.slot():
+            pass
+
+    holder = start(hold)
+    holding.wait(5)
+    waiter = start(wait_for_slot)
+    while gate.stats()["queue_depth"] < 1:
+        time.sleep(0.001)
+
+    started = time.perf_counter()
+    with pytest.raises(Overloaded) as raised:
+        with gate.slot():
+            pass
+    assert time.perf_counter() - started < 1
+    assert raised.value.reason == "at capacity"
+
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    stats = gate.stats()
+    assert (stats["admitted"], stats["rejected"], stats["queue_depth"]) == (2, 1, 0)
+
+
+def test_slot_is_released_when_the_block_raises():
+    gate = AdmissionGate(max_concurrent=1, max_queue=1, max_wait=0.05)
+    with pytest.raises(RuntimeError):
+        with gate.slot():
+            raise RuntimeError("generation failed")
+    with gate.slot():
+        assert gate.stats()["running"] == 1
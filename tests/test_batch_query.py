@@ -0,0 +1,28 @@
+import pytest
+
+from rag.batch_query import parse_questions, read_questions
+
+
+def test_parse_questions_accepts_strings_and_objects():
+    questions = parse_questions(["  What is mentoring? ", {"id": "q2", "query": "Who mentors?"}, {"question": "Why?"}])
+    assert questions == [
+        {"id": 0, "question": "What is mentoring?"},
+        {"id": "q2", "question": "Who mentors?"},
+        {"id": 2, "question": "Why?"},
+    ]
+
+
+@pytest.mark.parametrize("item", [{"id": 1}, {"question": "   "}, 42])
+def test_parse_questions_rejects_items_without_a_question(item):
+    with pytest.raises(ValueError, match="item 1"):
+        parse_questions(["fine", item])
+
+
+def test_read_questions_mixes_json_lines_and_plain_text():
+    lines = ['{"id": "a", "question": "What is the mentoring gap?"}\n', "\n", "How to keep matches going?\n",
+             '"Quoted question?"\n']
+    assert read_questions(lines) == [
+        {"id": "a", "question": "What is the mentoring gap?"},
+        {"id": 1, "question": "How to keep matches going?"},
+        {"id": 2, "question": "Quoted question?"},
+    ]
@@ -0,0 +1,52 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.context_builder import build_context, containment, mmr_order, trim_overlap
+
+
+def test_mmr_picks_the_most_relevant_first_then_diversifies():
+    query = np.array([1.0, 0.0, 0.0])
+    vectors = [
+        np.array([0.9, 0.1, 0.0]),   # most relevant
+        np.array([0.9, 0.11, 0.0]),  # near-copy of the first
+        np.array([0.7, 0.0, 0.7]),   # less relevant, but different
+    ]
+    assert mmr_order(query, vectors, lambda_mult=0.5) == [0, 2, 1]
+    # lambda 1 is plain relevance order
+    assert mmr_order(query, vectors, lambda_mult=1.0) == [0, 1, 2]
+    assert mmr_order(query, []) == []
+
+
+def test_trim_overlap_removes_the_repeated_chunk_boundary():
+    kept = "Mentors should meet their mentees regularly. Consistency builds trust over many months."
+    text = "Consistency builds trust over many months. Programs should also train mentors."
+    assert trim_overlap(text, kept) == "Programs should also train mentors."
+    assert trim_overlap("Nothing in common here at all.", kept) == "Nothing in common here at all."
+
+
+def candidate(doc_id, text, vector=None):
+    return Document(page_content=text, metadata={"id": doc_id}), 1.0, vector
+
+
+def test_build_context_drops_near_duplicates_and_keeps_the_budget():
+    text = "good mentors listen to young people and help them set goals for school and work " * 3
+    candidates = [
+        candidate("a", text),
+        candidate("b", text + "again"),
+        candidate("c", "the mentoring gap is largest for youth in rural areas " * 2),
+        candidate("d", "x " * 4000),
+    ]
+    assert containment(candidates[0][0].page_content, candidates[1][0].page_content) == 1.0
+
+    selected = build_context(None, candidates, max_chunks=5, token_budget=200)
+    assert [doc.metadata["id"] for doc, _ in selected] == ["a", "c"]
+
+
+def test_build_context_orders_by_mmr_when_every_candidate_has_a_vector():
+    query = np.array([1.0, 0.0])
+    candidates = [
+        candidate("far", "youth employment outcomes", np.array([0.0, 1.0])),
+        candidate("close", "what makes a good mentor", np.array([1.0, 0.0])),
+    ]
+    selected = build_context(query, candidates, max_chunks=1)
+    assert [doc.metadata["id"] for doc, _ in selected] == ["close"]
@@ -0,0 +1,45 @@
+from langchain_core.documents import Document
+
+from rag.ingest_manifest import (chunk_hash, file_hash, load_manifest, manifest_version, plan_changes,
+                                 save_manifest)
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_plan_changes_finds_new_changed_and_removed_pdfs(tmp_path):
+    same = write(tmp_path / "same.pdf", b"unchanged")
+    edited = write(tmp_path / "edited.pdf", b"new bytes")
+    added = write(tmp_path / "added.pdf", b"added")
+    manifest = {"files": {
+        same: {"sha256": file_hash(same), "chunks": {}},
+        edited: {"sha256": "old hash", "chunks": {}},
+        "gone.pdf": {"sha256": "x", "chunks": {}},
+    }}
+
+    changed, removed = plan_changes(manifest, [same, edited, added])
+
+    assert changed == {edited: file_hash(edited), added: file_hash(added)}
+    assert removed == ["gone.pdf"]
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    assert load_manifest(path) == {"files": {}}
+
+    manifest = {"files": {"a.pdf": {"sha256": "h", "chunks": {"a.pdf:1:0": "c"}}}}
+    save_manifest(manifest, path)
+    assert load_manifest(path) == manifest
+
+
+def test_manifest_version_only_depends_on_chunks():
+    chunks = {"a.pdf:1:0": chunk_hash(Document(page_content="text")), "a.pdf:1:1": "h2"}
+    one = {"files": {"a.pdf": {"sha256": "file hash", "chunks": chunks}}}
+    # same chunks, different file hash and key order
+    two = {"files": {"a.pdf": {"chunks": dict(reversed(list(chunks.items()))), "sha256": "other"}}}
+    assert manifest_version(one) == manifest_version(two)
+
+    three = {"files": {"a.pdf": {"sha256": "file hash", "chunks": {**chunks, "a.pdf:1:1": "edited"}}}}
+    assert manifest_version(three) != manifest_version(one)
@@ -0,0 +1,76 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.lexical_index import LexicalIndex, index_digest, reciprocal_rank_fusion, tokenize, update_lexical_index
+
+TEXTS = {
+    "a.pdf:1:0": "Good mentors listen to newcomer youth and build trust over time.",
+    "a.pdf:2:0": "Match retention improves when mentoring programs train their mentors.",
+    "b.pdf:1:0": "The mentoring gap: many young Canadians never had a mentor.",
+}
+
+
+def chunk(doc_id, text):
+    return Document(page_content=text, metadata={"id": doc_id, "source": doc_id.split(":")[0]})
+
+
+def hit_ids(hits):
+    return [doc.metadata["id"] for doc, _ in hits]
+
+
+def test_tokenize_drops_stopwords_and_case():
+    assert tokenize("What is THE mentoring gap?") == ["mentoring", "gap"]
+
+
+def test_build_and_search_round_trip(tmp_path):
+    path = str(tmp_path / "lexical")
+    doc_ids = list(TEXTS)
+    LexicalIndex.build(doc_ids, list(TEXTS.values()), [{"id": doc_id} for doc_id in doc_ids], path=path)
+
+    index = LexicalIndex(path)
+    assert index.count == 3
+    hits = index.search("mentoring gap", k=5)
+    assert hit_ids(hits)[0] == "b.pdf:1:0"
+    assert hits[0][0].page_content == TEXTS["b.pdf:1:0"]
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+    # chunks without any query term are left out
+    assert index.search("pinecone", k=5) == []
+
+
+def test_update_replaces_and_deletes_chunks(tmp_path):
+    path = str(tmp_path / "lexical")
+    update_lexical_index([chunk(doc_id, text) for doc_id, text in TEXTS.items()], path=path)
+    first_digest = index_digest(path)
+
+    index = update_lexical_index([chunk("a.pdf:1:0", "Mentors should receive safeguarding training.")],
+                                 deleted_ids=["b.pdf:1:0"], path=path)
+
+    assert index.count == 2
+    assert index.search("gap", k=5) == []
+    assert hit_ids(index.search("safeguarding", k=5)) == ["a.pdf:1:0"]
+    assert [row["id"] for row in index.rows()] == ["a.pdf:1:0", "a.pdf:2:0"]
+    assert index_digest(path) != first_digest
+
+
+def test_digest_only_depends_on_the_content(tmp_path):
+    chunks = [chunk(doc_id, text) for doc_id, text in TEXTS.items()]
+    update_lexical_index(chunks, path=str(tmp_path / "one"))
+    update_lexical_index(reversed(chunks), path=str(tmp_path / "two"))
+
+    assert index_digest(str(tmp_path / "one")) == index_digest(str(tmp_path / "two"))
+    assert index_digest(str(tmp_path / "missing")) == ""
+
+
+def test_reciprocal_rank_fusion_rewards_chunks_found_by_both_rankings():
+    a, b, c = (chunk(doc_id, doc_id) for doc_id in ("a", "b", "c"))
+    vector = np.ones(3)
+    dense = [(a, 0.9, vector), (b, 0.8, vector)]
+    lexical = [(b, 7.0), (c, 3.0)]
+
+    fused = reciprocal_rank_fusion([dense, lexical], k=60)
+
+    assert [doc.metadata["id"] for doc, _, _ in fused] == ["b", "a", "c"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+    # the dense vector survives fusion, BM25-only hits have none
+    assert fused[0][2] is vector
+    assert fused[2][2] is None
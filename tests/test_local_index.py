@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from rag.local_index import _INT8_BLOCK_ROWS, LocalVectorStore, quantize_int8
+
+
+def clustered(rng, count, dim=64):
+    centers = rng.normal(size=(8, dim))
+    return (centers[rng.integers(0, 8, count)] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def store(path, vectors, quantize=None):
+    ids = [f"doc:{i}" for i in range(len(vectors))]
+    db = LocalVectorStore(path=str(path), quantize=quantize)
+    db.upsert_vectors(ids, vectors, [f"text {i}" for i in ids], [{"id": doc_id} for doc_id in ids])
+    return db
+
+
+def test_float32_top_k_matches_exact_cosine(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = clustered(rng, 300)
+    query = rng.normal(size=64).astype(np.float32)
+    db = store(tmp_path / "index", vectors)
+
+    rows, scores = db.top_k(query, k=5)
+
+    exact = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+    assert list(rows) == list(np.argsort(-exact)[:5])
+    np.testing.assert_allclose(scores, exact[rows], rtol=1e-5)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_int8_top_k_agrees_with_float32(tmp_path):
+    rng = np.random.default_rng(1)
+    # more than one scoring block, and a last block that is not full
+    vectors = clustered(rng, 2 * _INT8_BLOCK_ROWS + 17)
+    full = store(tmp_path / "float32", vectors)
+    quantized = store(tmp_path / "int8", vectors, quantize="int8")
+
+    assert quantized.matrix.dtype == np.int8
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    recalls = []
+    for query in clustered(rng, 20):
+        rows, _ = full.top_k(query, k=10)
+        int8_rows, int8_scores = quantized.top_k(query, k=10)
+        # every score is close to the exact cosine of its row, so only near-ties can swap places
+        np.testing.assert_allclose(int8_scores, unit[int8_rows] @ (query / np.linalg.norm(query)), atol=0.01)
+        recalls.append(len(set(rows) & set(int8_rows)) / 10)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_int8_index_reopens_quantized(tmp_path):
+    vectors = clustered(np.random.default_rng(2), 10)
+    store(tmp_path / "index", vectors, quantize="int8")
+
+    reopened = LocalVectorStore(path=str(tmp_path / "index"))
+    assert reopened.quantize == "int8"
+    assert reopened.top_k(vectors[3], k=1)[0][0] == 3
+
+
+def test_quantize_int8_round_trip():
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(4, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    quantized, scales = quantize_int8(vectors)
+    assert quantized.dtype == np.int8
+    np.testing.assert_allclose(quantized * scales[:, None], vectors, atol=scales.max())
+
+
+def test_empty_index_returns_nothing(tmp_path):
+    db = LocalVectorStore(path=str(tmp_path / "missing"))
+    rows, scores = db.top_k(np.ones(8, dtype=np.float32), k=3)
+    assert len(rows) == 0 and len(scores) == 0
+    assert db.similarity_search_by_vector_with_vectors(np.ones(8), k=3) == []
+
+
+@pytest.mark.parametrize("quantize", [None, "int8"])
+def test_k_larger_than_the_index(tmp_path, quantize):
+    vectors = clustered(np.random.default_rng(4), 3)
+    rows, _ = store(tmp_path / "index", vectors, quantize=quantize).top_k(vectors[0], k=10)
+    assert sorted(rows) == [0, 1, 2]
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import rag.semantic_cache as semantic_cache
+from rag.semantic_cache import SemanticCache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        # every call moves a little, so LRU order never depends on two calls landing on the same timestamp
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(**kwargs):
+        path = str(tmp_path / "answers.sqlite") if request.param == "sqlite" else None
+        return SemanticCache(path=path, **kwargs)
+    return make
+
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_returns_the_closest_answer_above_the_threshold(make_cache, clock):
+    cache = make_cache(threshold=0.9)
+    cache.store("good mentor?", vector(1, 0, 0), "patient", [{"id": "a"}], "v1")
+    cache.store("mentoring gap?", vector(0, 1, 0), "the gap", [{"id": "b"}], "v1")
+
+    found = cache.lookup(vector(0.99, 0.05, 0), "v1")
+    assert found["answer"] == "patient"
+    assert found["sources"] == [{"id": "a"}]
+    assert found["similarity"] > 0.9
+
+    assert cache.lookup(vector(1, 1, 0), "v1") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_the_ttl(make_cache, clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.store("q", vector(1, 0), "a", [], "v1")
+    assert cache.lookup(vector(1, 0), "v1") is not None
+
+    clock.now += 61
+    assert cache.lookup(vector(1, 0), "v1") is None
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    cache = make_cache(max_entries=2)
+    cache.store("x", vector(1, 0, 0), "x", [], "v1")
+    cache.store("y", vector(0, 1, 0), "y", [], "v1")
+    # using x makes y the least recently used
+    assert cache.lookup(vector(1, 0, 0), "v1")["answer"] == "x"
+    cache.store("z", vector(0, 0, 1), "z", [], "v1")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(vector(1, 0, 0), "v1")["answer"] == "x"
+    assert cache.lookup(vector(0, 0, 1), "v1")["answer"] == "z"
+    assert cache.lookup(vector(0, 1, 0), "v1") is None
+
+
+def test_a_new_index_version_drops_every_entry(make_cache, clock):
+    cache = make_cache()
+    cache.store("q", vector(1, 0), "old answer", [], "v1")
+    assert cache.lookup(vector(1, 0), "v1") is not None
+
+    assert cache.lookup(vector(1, 0), "v2") is None
+    cache.store("q", vector(1, 0), "new answer", [], "v2")
+    assert cache.lookup(vector(1, 0), "v2")["answer"] == "new answer"
+    assert cache.stats()["entries"] == 1
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "answers.sqlite")
+    writer = SemanticCache(path=path)
+    reader = SemanticCache(path=path)
+    assert reader.lookup(vector(1, 0), "v1") is None
+
+    writer.store("q", vector(1, 0), "a", [], "v1")
+    assert reader.lookup(vector(1, 0), "v1")["answer"] == "a"